@@ -0,0 +1,455 @@
+"""
+    benchmark.py measures how the voting functions scale. It generates seeded synthetic profiles, feeds them to the rules
+    through each input path (ranked profiles, the generatePreferences dictionary and ballots files), and records the wall
+    time and peak memory of every run as one JSON line, so two runs can be compared to catch regressions.
+
+    Example:
+        python benchmark.py --agents 100 10000 1000000 --alternatives 3 20 200 --output results.jsonl
+        python benchmark.py --output new.jsonl --compare results.jsonl
+        python benchmark.py --import-budget
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import voting
+
+
+# the following functions generate synthetic profiles. They all return a numpy array of shape (agents, alternatives)
+# holding each agent's ranked alternative indices, most preferred first, like PreferenceProfile.rankings
+
+def impartialCulture(n_agents, n_alternatives, seed=0):
+    """
+        impartialCulture will draw every agent's ranking independently and uniformly from all possible rankings
+
+        Parameters:
+            n_agents: int - number of agents
+
+            n_alternatives: int - number of alternatives
+
+            seed: int, default=0 - seed of the random generator
+
+        Return:
+            rankings: numpy array of shape (n_agents, n_alternatives)
+    """
+
+    rng = np.random.default_rng(seed)
+    return rng.permuted(np.tile(np.arange(n_alternatives), (n_agents, 1)), axis=1)
+
+
+def mallows(n_agents, n_alternatives, phi=0.5, seed=0):
+    """
+        mallows will draw every agent's ranking from a Mallows model around a random central ranking, using the repeated
+        insertion method. A phi close to 0 makes all agents agree with the central ranking, phi=1 is impartialCulture
+
+        Parameters:
+            n_agents: int - number of agents
+
+            n_alternatives: int - number of alternatives
+
+            phi: float, default=0.5 - dispersion of the model, between 0 and 1
+
+            seed: int, default=0 - seed of the random generator
+
+        Return:
+            rankings: numpy array of shape (n_agents, n_alternatives)
+    """
+
+    rng = np.random.default_rng(seed)
+    center = rng.permutation(n_alternatives)
+
+    # positions[a, i] is the position of the i-th alternative of the central ranking in agent a's ranking so far
+    positions = np.zeros((n_agents, n_alternatives), dtype=np.int64)
+    for i in range(1, n_alternatives):
+        # the i-th alternative is inserted at position j (0 <= j <= i) with probability proportional to phi^(i - j)
+        weights = phi ** (i - np.arange(i + 1, dtype=float))
+        insert_at = np.searchsorted(np.cumsum(weights) / weights.sum(), rng.random(n_agents), side='right')
+        insert_at = np.minimum(insert_at, i)
+
+        positions[:, :i] += positions[:, :i] >= insert_at[:, np.newaxis]
+        positions[:, i] = insert_at
+
+    rankings = np.empty_like(positions)
+    np.put_along_axis(rankings, positions, np.broadcast_to(center, positions.shape), axis=1)
+    return rankings
+
+
+def rankingsToScores(rankings):
+    """
+        rankingsToScores will turn rankings into a preference score matrix (the input format of the worksheets) that
+        generatePreferences ranks back into the same rankings. The top ranked alternative scores the number of
+        alternatives, the last ranked scores 1
+
+        Parameters:
+            rankings: numpy array of shape (agents, alternatives) - ranked alternative indices
+
+        Return:
+            scores: numpy array of shape (agents, alternatives)
+    """
+
+    n_agents, n_alternatives = rankings.shape
+    scores = np.empty(rankings.shape, dtype=float)
+    np.put_along_axis(scores, rankings, np.arange(n_alternatives, 0, -1, dtype=float)[np.newaxis], axis=1)
+    return scores
+
+
+MODELS = {
+    'ic': impartialCulture,
+    'mallows': mallows,
+}
+
+RULES = ('plurality', 'veto', 'borda', 'harmonic', 'STV', 'rangeVoting')
+
+# ranked paths hold the profile in memory, file paths go through a ballots loader every time
+RANKED_PATHS = ('profile', 'compressed', 'dict')
+FILE_PATHS = ('xlsx', 'csv', 'npy')
+
+
+def measure(function, setup=None, repeat=3):
+    """
+        measure will time a function and record its peak memory. The time is the best of repeat runs without tracing, the
+        peak memory comes from one extra run under tracemalloc (which tracks numpy's allocations as well)
+
+        Parameters:
+            function: function - called with the value returned by setup
+
+            setup: function, default=None - builds the input of each run, not measured
+
+            repeat: int, default=3 - number of timed runs
+
+        Return:
+            seconds: float, peak_bytes: int
+    """
+
+    setup = setup or (lambda: None)
+
+    seconds = float('inf')
+    for _ in range(repeat):
+        argument = setup()
+        gc.collect()
+        start = time.perf_counter()
+        function(argument)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    argument = setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function(argument)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return seconds, peak_bytes
+
+
+def _write_ballots(path, scores, directory):
+    """
+        _write_ballots will write a score matrix to a ballots file of the given input path and return the file name
+    """
+
+    filename = os.path.join(directory, f'ballots.{path}')
+
+    if path == 'npy':
+        np.save(filename, scores)
+    elif path == 'csv':
+        np.savetxt(filename, scores, delimiter=',', fmt='%g')
+    else:
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet()
+        for row in scores.tolist():
+            worksheet.append(row)
+        workbook.save(filename)
+
+    return filename
+
+
+def _fresh_profile(rankings):
+    """
+        _fresh_profile will build a PreferenceProfile without any cached tallies, so every timed run does the full work
+    """
+
+    return voting.PreferenceProfile(rankings)
+
+
+def benchmarkProfile(rankings, paths, rules, repeat=3, max_file_agents=100000):
+    """
+        benchmarkProfile will run every rule through every input path on one profile
+
+        Parameters:
+            rankings: numpy array of shape (agents, alternatives) - the profile, see impartialCulture
+
+            paths: list - input paths to measure, from RANKED_PATHS and FILE_PATHS
+
+            rules: list - rules to measure, from RULES
+
+            repeat: int, default=3 - number of timed runs of each measurement
+
+            max_file_agents: int, default=100000 - ballots files are only written and measured up to this many agents
+
+        Return:
+            records: list - one dictionary per measurement with the 'path', 'rule', 'seconds' and 'peak_bytes'. The 'load'
+            rule measures turning the input into a profile, and 'generatePreferences' the dictionary of the worksheet
+    """
+
+    n_agents = len(rankings)
+    records = []
+
+    def record(path, rule, function, setup=None):
+        seconds, peak_bytes = measure(function, setup, repeat)
+        records.append({'path': path, 'rule': rule, 'seconds': seconds, 'peak_bytes': peak_bytes})
+
+    for path in paths:
+        if path == 'profile':
+            record(path, 'load', voting.PreferenceProfile, lambda: rankings)
+            setup = lambda: _fresh_profile(rankings)
+
+        elif path == 'compressed':
+            record(path, 'load', lambda profile: profile.compress(), lambda: _fresh_profile(rankings))
+            compressed = _fresh_profile(rankings).compress()
+            setup = lambda: voting.PreferenceProfile(compressed.rankings, compressed.agents, compressed.alternatives,
+                                                     weights=compressed.weights, agent_ballots=compressed.agent_ballots)
+
+        elif path == 'dict':
+            pref_dict = _fresh_profile(rankings).to_dict()
+            record(path, 'load', voting.PreferenceProfile.from_dict, lambda: pref_dict)
+            setup = lambda: pref_dict
+
+        else:
+            continue
+
+        for rule in rules:
+            # rangeVoting needs the preference scores, which only the ballots files have
+            if rule != 'rangeVoting':
+                record(path, rule, getattr(voting, rule), setup)
+
+    file_paths = [path for path in paths if path in FILE_PATHS]
+    if file_paths and n_agents <= max_file_agents:
+        scores = rankingsToScores(rankings)
+
+        with tempfile.TemporaryDirectory() as directory:
+            for path in file_paths:
+                filename = _write_ballots(path, scores, directory)
+
+                record(path, 'load', voting.PreferenceProfile.from_worksheet, lambda: filename)
+                if path == 'xlsx':
+                    from openpyxl import load_workbook
+
+                    record(path, 'generatePreferences', lambda name: voting.generatePreferences(
+                        load_workbook(name, read_only=True).active), lambda: filename)
+
+                for rule in rules:
+                    if rule == 'rangeVoting':
+                        record(path, rule, voting.rangeVoting, lambda: filename)
+                    else:
+                        # the rule runs on the file end to end: loading the ballots and then tallying them
+                        record(path, rule, lambda name, rule=rule: getattr(voting, rule)(
+                            voting.PreferenceProfile.from_worksheet(name)), lambda: filename)
+
+    return records
+
+
+def runBenchmarks(agents, alternatives, models=('ic',), paths=RANKED_PATHS + FILE_PATHS, rules=RULES, phi=0.5,
+                  seed=0, repeat=3, max_file_agents=100000, output=None):
+    """
+        runBenchmarks will sweep the number of agents and alternatives for every model, benchmark each profile and write
+        the records as JSON lines as soon as each profile is done
+
+        Parameters:
+            agents: list - numbers of agents to sweep
+
+            alternatives: list - numbers of alternatives to sweep
+
+            models: list, default=('ic',) - synthetic models, keys of MODELS
+
+            paths: list, default=every path - input paths, see benchmarkProfile
+
+            rules: list, default=RULES - rules to measure
+
+            phi: float, default=0.5 - dispersion of the mallows model
+
+            seed: int, default=0 - seed of the profile generators
+
+            repeat: int, default=3 - number of timed runs of each measurement
+
+            max_file_agents: int, default=100000 - ballots files are only measured up to this many agents
+
+            output: file, default=None - file object the JSON lines are written to
+
+        Return:
+            records: list - every record, with the profile's 'model', 'agents', 'alternatives' and 'seed' added
+    """
+
+    records = []
+    for model in models:
+        for n_alternatives in alternatives:
+            for n_agents in agents:
+                if model == 'mallows':
+                    rankings = mallows(n_agents, n_alternatives, phi, seed)
+                else:
+                    rankings = MODELS[model](n_agents, n_alternatives, seed)
+
+                for record in benchmarkProfile(rankings, paths, rules, repeat, max_file_agents):
+                    record = {'model': model, 'agents': n_agents, 'alternatives': n_alternatives, 'seed': seed,
+                              **record}
+                    records.append(record)
+                    if output is not None:
+                        output.write(json.dumps(record) + '\n')
+                        output.flush()
+
+    return records
+
+
+def compareResults(records, baseline, tolerance=1.5):
+    """
+        compareResults will find the measurements that got slower than a baseline run by more than the tolerance factor
+
+        Parameters:
+            records: list - the new records
+
+            baseline: list - the records of an earlier run
+
+            tolerance: float, default=1.5 - allowed slowdown factor
+
+        Return:
+            regressions: list - (record, baseline seconds) pairs for every slower measurement
+    """
+
+    key = lambda record: (record['model'], record['agents'], record['alternatives'], record['path'], record['rule'])
+    baseline_seconds = {key(record): record['seconds'] for record in baseline}
+
+    return [(record, baseline_seconds[key(record)]) for record in records
+            if key(record) in baseline_seconds and record['seconds'] > tolerance * baseline_seconds[key(record)]]
+
+
+# modules that import voting must not load. They are imported by the functions that need them
+LAZY_MODULES = ('openpyxl', 'pyarrow', 'concurrent.futures.process', 'multiprocessing.shared_memory')
+
+# seconds importing voting may take on top of numpy, used by --import-budget and the tests. VOTING_IMPORT_BUDGET overrides it
+IMPORT_BUDGET = float(os.environ.get('VOTING_IMPORT_BUDGET', 0.05))
+
+_IMPORT_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+import numpy
+numpy_seconds = time.perf_counter() - start
+import {module}
+print(time.perf_counter() - start, numpy_seconds, *[name for name in {lazy!r} if name in sys.modules])
+'''
+
+
+def importTime(module='voting', repeat=5):
+    """
+        importTime will measure how long importing a module takes in a fresh interpreter, and how much of that is numpy
+
+        Parameters:
+            module: str, default='voting' - the module to import
+
+            repeat: int, default=5 - number of interpreters started. The fastest one is kept
+
+        Return:
+            (seconds, numpy_seconds, loaded): (float, float, list) - the import time including numpy, the time of 
+            importing numpy alone, and the LAZY_MODULES that were loaded by the import
+    """
+
+    script = _IMPORT_SCRIPT.format(module=module, lazy=LAZY_MODULES)
+    directory = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', script], cwd=directory, capture_output=True, text=True,
+                                check=True).stdout.split()
+        seconds, numpy_seconds, loaded = float(output[0]), float(output[1]), output[2:]
+        if best is None or seconds < best[0]:
+            best = (seconds, numpy_seconds, loaded)
+
+    return best
+
+
+def checkImportTime(budget=IMPORT_BUDGET, module='voting', repeat=5):
+    """
+        checkImportTime will check that importing a module takes at most budget seconds on top of importing numpy, and that
+        it does not load any of the LAZY_MODULES
+
+        Parameters:
+            budget: float, default=IMPORT_BUDGET - allowed import time in seconds, not counting numpy
+
+            module: str, default='voting' - the module to import
+
+            repeat: int, default=5 - see importTime
+
+        Return:
+            problems: list - a message for every failed check, empty when the import is within budget
+    """
+
+    seconds, numpy_seconds, loaded = importTime(module, repeat)
+
+    problems = []
+    if seconds - numpy_seconds > budget:
+        problems.append(f'importing {module} took {seconds - numpy_seconds:.4f}s on top of numpy, '
+                        f'the budget is {budget:.4f}s')
+    if loaded:
+        problems.append(f'importing {module} loaded {", ".join(loaded)}')
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the voting rules on synthetic profiles.')
+    parser.add_argument('--agents', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--alternatives', type=int, nargs='+', default=[3, 10, 50])
+    parser.add_argument('--models', nargs='+', default=['ic'], choices=sorted(MODELS))
+    parser.add_argument('--phi', type=float, default=0.5, help='dispersion of the mallows model')
+    parser.add_argument('--paths', nargs='+', default=list(RANKED_PATHS + FILE_PATHS),
+                        choices=RANKED_PATHS + FILE_PATHS)
+    parser.add_argument('--rules', nargs='+', default=list(RULES), choices=RULES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-file-agents', type=int, default=100000,
+                        help='largest profile written to ballots files')
+    parser.add_argument('--output', help='JSON lines file for the results, default is stdout')
+    parser.add_argument('--compare', help='JSON lines file of an earlier run to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed slowdown factor with --compare')
+    parser.add_argument('--import-budget', type=float, nargs='?', const=IMPORT_BUDGET,
+                        help='only check that importing voting takes at most this many seconds on top of numpy, '
+                             f'default {IMPORT_BUDGET}')
+    args = parser.parse_args(argv)
+
+    if args.import_budget is not None:
+        problems = checkImportTime(args.import_budget)
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        return 1 if problems else 0
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        records = runBenchmarks(args.agents, args.alternatives, args.models, args.paths, args.rules, args.phi,
+                                args.seed, args.repeat, args.max_file_agents, output)
+    finally:
+        if args.output:
+            output.close()
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = [json.loads(line) for line in baseline_file if line.strip()]
+
+        regressions = compareResults(records, baseline, args.tolerance)
+        for record, seconds in regressions:
+            print(f"slower: {record['model']} {record['agents']}x{record['alternatives']} {record['path']} "
+                  f"{record['rule']}: {seconds:.4f}s -> {record['seconds']:.4f}s", file=sys.stderr)
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
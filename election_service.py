@@ -0,0 +1,377 @@
+"""
+    election_service.py runs the voting functions behind an asyncio service. Ballot uploads (bytes, async streams of bytes
+    or files) are parsed in an executor so the event loop is never blocked by openpyxl, concurrent tally requests for the
+    same profile are batched into one evaluate_all call, and the number of running jobs and waiting requests is limited.
+
+    Example:
+        async with ElectionService(max_concurrency=4, max_pending=64) as service:
+            client = InProcessClient(service)
+            profile_id = (await client.upload(data, 'ballots.xlsx'))['profile_id']
+            borda, stv = await asyncio.gather(client.tally(profile_id, 'borda'), client.tally(profile_id, 'STV'))
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import voting
+
+
+# the rules a tally request can ask for, see evaluate_all
+RULES = frozenset(voting.rules._SCORE_VECTORS) | {'scoringRule', 'rangeVoting'} | voting.tally._RANKED_RULES
+
+
+class ServiceBusy(Exception):
+    """
+        ServiceBusy is raised when a request arrives while max_pending requests are already waiting and the service was
+        created with wait=False
+    """
+
+
+class ElectionService:
+    """
+        ElectionService keeps the uploaded profiles in memory as BallotTally objects and answers tally requests for them.
+
+        Requests for the same profile that arrive within batch_delay seconds of each other (and share the tie-breaking
+        rule, score vector, dictator and k) are answered by a single evaluate_all call, so the rules share their position
+        counts and pairwise matrix, and identical requests are only computed once.
+
+        Backpressure: at most max_concurrency parsing or voting jobs run in the executor at once, and at most max_pending
+        requests are accepted at a time. Further requests wait for a free slot, or raise ServiceBusy when wait=False.
+    """
+
+    def __init__(self, max_concurrency=4, max_pending=64, wait=True, batch_delay=0.0, max_upload_bytes=None,
+                 executor=None, chunk_size=10000, upload_directory=None):
+        """
+            Parameters:
+                max_concurrency: int, default=4 - maximum number of jobs running in the executor
+
+                max_pending: int, default=64 - maximum number of requests accepted at a time
+
+                wait: bool, default=True - make requests beyond max_pending wait instead of raising ServiceBusy
+
+                batch_delay: float, default=0.0 - seconds a tally request waits for others to join its batch. With 0 the
+                batch holds the requests made before the event loop runs again, for example by one asyncio.gather
+
+                max_upload_bytes: int, default=None - largest accepted upload, None for no limit
+
+                executor: concurrent.futures.Executor, default=None - executor for parsing and voting. None creates a
+                ThreadPoolExecutor with max_concurrency threads, which is shut down by close
+
+                chunk_size: int, default=10000 - number of agents parsed at a time, see iterScoreChunks
+
+                upload_directory: str or path, default=None - directory of the ballots files that can be uploaded by
+                path. None only accepts uploads of the files' content
+        """
+
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.wait = wait
+        self.batch_delay = batch_delay
+        self.max_upload_bytes = max_upload_bytes
+        self.chunk_size = chunk_size
+        self.upload_directory = None if upload_directory is None else os.path.realpath(upload_directory)
+
+        self._own_executor = executor is None
+        self._executor = ThreadPoolExecutor(max_concurrency) if executor is None else executor
+        self._jobs = asyncio.Semaphore(max_concurrency)
+        self._pending = asyncio.Semaphore(max_pending)
+        self._n_pending = 0
+
+        # profile id: BallotTally, and the lock that keeps one batch per profile running at a time
+        self._tallies = {}
+        self._locks = {}
+
+        # profile id: future of the upload being parsed, so the same file uploaded twice at once is parsed once
+        self._uploads = {}
+
+        # (profile id, tieBreak, scoreVector, agent, k): {rule: future} of the batch that has not started yet, and the
+        # tasks flushing the batches. The event loop only keeps weak references to tasks, so they are kept here
+        self._batches = {}
+        self._flushes = set()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """
+            close will shut down the executor created by the service
+        """
+
+        if self._own_executor:
+            await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    @property
+    def profiles(self):
+        return list(self._tallies)
+
+    async def _run(self, function, *args):
+        # run a blocking function in the executor, at most max_concurrency at a time
+        async with self._jobs:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def _admit(self):
+        if not self.wait and self._n_pending >= self.max_pending:
+            raise ServiceBusy(f'{self._n_pending} requests are already pending.')
+        self._n_pending += 1
+        await self._pending.acquire()
+
+    def _release(self):
+        self._n_pending -= 1
+        self._pending.release()
+
+    async def upload(self, data, name='ballots.xlsx'):
+        """
+            upload will parse a ballots file into a profile and return its id. The id is a hash of the uploaded bytes, so
+            uploading the same file again returns the same id without parsing it again
+
+            Parameters:
+                data: bytes, async iterable of bytes, str or path - the content of a ballots file, a stream of its chunks,
+                or the path of a ballots file in upload_directory
+
+                name: str, default='ballots.xlsx' - the file name of the upload, whose extension picks the ballots loader
+                (see iterScoreChunks). Ignored when data is a path
+
+            Return:
+                profile_id: str
+        """
+
+        await self._admit()
+        try:
+            if isinstance(data, (str, os.PathLike)):
+                path = self._upload_path(data)
+                profile_id = await self._run(_hash_file, path)
+                await self._load(profile_id, path)
+                return profile_id
+
+            path, profile_id = await self._spool(data, os.path.splitext(name)[1].lower())
+            try:
+                await self._load(profile_id, path)
+            finally:
+                os.remove(path)
+            return profile_id
+
+        finally:
+            self._release()
+
+    def _upload_path(self, path):
+        # only files inside upload_directory can be uploaded by path, so a request cannot read other files of the server
+        path = os.path.realpath(path)
+        if self.upload_directory is None or os.path.commonpath([self.upload_directory, path]) != self.upload_directory:
+            raise ValueError('Uploads by path are only accepted from the upload directory.')
+        if not os.path.isfile(path):
+            raise ValueError(f'No ballots file {os.path.basename(path)!r} in the upload directory.')
+        return path
+
+    async def _load(self, profile_id, path):
+        """
+            _load will parse a ballots file into the profile profile_id, unless it is known already. When the same
+            profile is being parsed for another upload, its result is awaited instead
+        """
+
+        if profile_id in self._tallies:
+            return
+        if profile_id in self._uploads:
+            upload = self._uploads[profile_id]
+            try:
+                await asyncio.shield(upload)
+                return
+            except asyncio.CancelledError:
+                if not upload.cancelled():
+                    raise
+            # the upload that was parsing the profile was cancelled, so this one parses it
+            return await self._load(profile_id, path)
+
+        upload = self._uploads[profile_id] = asyncio.get_running_loop().create_future()
+        try:
+            self._tallies[profile_id] = await self._run(self._parse, path)
+            upload.set_result(None)
+        except asyncio.CancelledError:
+            upload.cancel()
+            raise
+        except Exception as error:
+            upload.set_exception(error)
+            # the error is raised here, so the future does not need to be awaited
+            upload.exception()
+            raise
+        finally:
+            del self._uploads[profile_id]
+
+    async def _spool(self, data, extension):
+        """
+            _spool will write an upload to a temporary file with the given extension and hash it on the way. A stream is
+            written chunk by chunk, so it is only read as fast as the disk takes it
+        """
+
+        if extension not in voting.ballots._LOADERS:
+            raise ValueError(f'No ballots loader for {extension!r} files.')
+
+        descriptor, path = tempfile.mkstemp(suffix=extension)
+        digest = hashlib.blake2b(digest_size=20)
+        size = 0
+        try:
+            with os.fdopen(descriptor, 'wb') as spooled:
+                chunks = [data] if isinstance(data, (bytes, bytearray, memoryview)) else data
+                if hasattr(chunks, '__aiter__'):
+                    async for chunk in chunks:
+                        size += len(chunk)
+                        self._check_size(size)
+                        digest.update(chunk)
+                        await self._run(spooled.write, chunk)
+                else:
+                    for chunk in chunks:
+                        size += len(chunk)
+                        self._check_size(size)
+                        digest.update(chunk)
+                        await self._run(spooled.write, chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+
+        return path, digest.hexdigest()
+
+    def _check_size(self, size):
+        if self.max_upload_bytes is not None and size > self.max_upload_bytes:
+            raise ValueError(f'Upload is larger than {self.max_upload_bytes} bytes.')
+
+    def _parse(self, path):
+        return voting.BallotTally.from_source(path, self.chunk_size)
+
+    def forget(self, profile_id):
+        """
+            forget will drop an uploaded profile
+
+            Return:
+                bool - whether the profile was known
+        """
+
+        self._locks.pop(profile_id, None)
+        return self._tallies.pop(profile_id, None) is not None
+
+    async def tally(self, profile_id, rule, tieBreak='max', scoreVector=None, agent=1, k=None):
+        """
+            tally will run a voting rule on an uploaded profile. Concurrent requests are batched, see ElectionService
+
+            Parameters:
+                profile_id: str - id returned by upload
+
+                rule: str - name of the voting function, one of RULES
+
+                tieBreak: str or int, default='max' - the tie break type to use if neccessary
+
+                scoreVector: list, default=None - the scores for 'scoringRule'
+
+                agent: int, default=1 - the dictator for 'dictatorship'
+
+                k: int, default=None - number of alternatives in the ranking. None ranks all of them
+
+            Return:
+                result: dictionary - the 'winner', the 'scores' of every alternative and the tie broken 'ranking', see
+                evaluate_all
+        """
+
+        if profile_id not in self._tallies:
+            raise KeyError(f'Unknown profile {profile_id!r}.')
+        if rule not in RULES:
+            raise ValueError(f'Unknown rule {rule!r}.')
+
+        await self._admit()
+        try:
+            key = (profile_id, tieBreak, None if scoreVector is None else tuple(scoreVector), agent, k)
+            batch = self._batches.get(key)
+            if batch is None:
+                batch = self._batches[key] = {}
+                flush = asyncio.get_running_loop().create_task(self._flush(key))
+                self._flushes.add(flush)
+                flush.add_done_callback(self._flushes.discard)
+
+            # identical requests in the same batch share one future
+            if rule not in batch:
+                batch[rule] = asyncio.get_running_loop().create_future()
+            return await asyncio.shield(batch[rule])
+
+        finally:
+            self._release()
+
+    async def _flush(self, key):
+        """
+            _flush will answer every request of a batch with one evaluate_all call, once batch_delay has passed
+        """
+
+        await asyncio.sleep(self.batch_delay)
+        batch = self._batches.pop(key)
+        profile_id, tieBreak, scoreVector, agent, k = key
+
+        try:
+            lock = self._locks.setdefault(profile_id, asyncio.Lock())
+            async with lock:
+                tally = self._tallies[profile_id]
+                results = await self._run(voting.evaluate_all, tally, list(batch), tieBreak,
+                                          None if scoreVector is None else list(scoreVector), agent, k)
+        except Exception as error:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for rule, future in batch.items():
+            if not future.done():
+                future.set_result(results[rule])
+
+
+def _hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as ballots:
+        for chunk in iter(lambda: ballots.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class InProcessClient:
+    """
+        InProcessClient talks to an ElectionService in the same process through request and response dictionaries, the
+        way an endpoint would, so the service can be tested without a server. Errors are returned as
+        {'ok': False, 'error': message} instead of being raised
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    async def request(self, request):
+        """
+            request will handle one request dictionary. 'action' is 'upload' (with 'data' and 'name'), 'tally' (with
+            'profile_id', 'rule' and optionally 'tieBreak', 'scoreVector', 'agent' and 'k') or 'forget' (with
+            'profile_id')
+
+            Return:
+                response: dictionary - {'ok': True, ...} with 'profile_id', 'result' or 'forgotten'
+        """
+
+        request = dict(request)
+        action = request.pop('action', None)
+        try:
+            if action == 'upload':
+                return {'ok': True, 'profile_id': await self.service.upload(**request)}
+            if action == 'tally':
+                return {'ok': True, 'result': await self.service.tally(**request)}
+            if action == 'forget':
+                return {'ok': True, 'forgotten': self.service.forget(**request)}
+            return {'ok': False, 'error': f'Unknown action {action!r}.'}
+
+        except (KeyError, ValueError, TypeError, ServiceBusy) as error:
+            # str of a KeyError quotes its message, so the message is taken from args
+            return {'ok': False, 'error': str(error.args[0]) if error.args else str(error)}
+
+    async def upload(self, data, name='ballots.xlsx'):
+        return await self.request({'action': 'upload', 'data': data, 'name': name})
+
+    async def tally(self, profile_id, rule, **options):
+        return await self.request({'action': 'tally', 'profile_id': profile_id, 'rule': rule, **options})
+
+    async def forget(self, profile_id):
+        return await self.request({'action': 'forget', 'profile_id': profile_id})
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import voting
+
+
+def _fresh(ballots, key):
+    tally = voting.BallotTally(keep_rankings=False)
+    for ballot in ballots:
+        tally.add_ballot(**{key: ballot})
+    return tally
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_removing_scores_matches_a_fresh_tally(seed):
+    rng = np.random.default_rng(seed)
+    tally = voting.BallotTally(keep_rankings=False)
+    held = []
+    for _ in range(30):
+        if held and rng.random() < 0.4:
+            assert tally.remove_ballot(scores=held.pop(int(rng.integers(len(held))))) is not False
+        else:
+            # decimal scores tie often, and random floats have no decimal reading
+            scores = np.round(rng.random(3) * 10, 1) if seed % 2 else rng.random(3)
+            held.append(scores.tolist())
+            tally.add_ballot(scores=held[-1])
+
+        if held:
+            fresh = _fresh(held, 'scores')
+            assert tally.score_sums.tolist() == fresh.score_sums.tolist()
+            for tieBreak in ('max', 'min'):
+                assert tally.winner('rangeVoting', tieBreak) == fresh.winner('rangeVoting', tieBreak)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_removing_rankings_matches_a_fresh_tally(seed):
+    rng = np.random.default_rng(seed)
+    tally = voting.BallotTally(keep_rankings=False)
+    held = []
+    for _ in range(60):
+        if held and rng.random() < 0.45:
+            assert tally.remove_ballot(ranking=held.pop(int(rng.integers(len(held))))) is not False
+        else:
+            held.append((rng.permutation(6) + 1).tolist())
+            tally.add_ballot(ranking=held[-1])
+
+        if held:
+            preferences = {agent: ranking for agent, ranking in enumerate(held, 1)}
+            for rule in ('plurality', 'veto', 'borda', 'harmonic'):
+                for tieBreak in ('max', 'min'):
+                    assert tally.winner(rule, tieBreak) == getattr(voting, rule)(preferences, tieBreak)
+
+
+def test_unknown_ballots_and_empty_tallies():
+    tally = voting.BallotTally(keep_rankings=False)
+    assert tally.winner('borda') is False
+    tally.add_ballot(ranking=[1, 2, 3])
+    assert tally.remove_ballot(ranking=[3, 2, 1]) is False
+    assert tally.remove_ballot(ranking=[1, 2, 3, 4]) is False
+    assert tally.remove_ballot(ranking=[1, 2, 3]) is None
+    assert tally.n_agents == 0 and (tally.position_counts >= 0).all()
+    assert tally.winner('plurality') is False
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import voting
+
+SCORES = np.random.default_rng(0).integers(0, 9, (2000, 4)).astype(float)
+
+
+def _check_chunks(path, chunk_size):
+    chunks = list(voting.iterScoreChunks(path, chunk_size))
+    assert all(len(chunk) == chunk_size for chunk in chunks[:-1])
+    assert 0 < len(chunks[-1]) <= chunk_size
+    assert np.array_equal(np.concatenate(chunks), SCORES)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 256, 333, 1000, 5000])
+def test_arrow_chunks_have_chunk_size_rows(tmp_path, chunk_size):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+
+    # record batches and row groups of 333 rows, which do not line up with the chunks
+    table = pa.table({f'alternative{i}': SCORES[:, i] for i in range(SCORES.shape[1])})
+    with pa.ipc.new_file(tmp_path / 'ballots.arrow', table.schema) as writer:
+        for start in range(0, len(SCORES), 333):
+            writer.write_table(table.slice(start, 333))
+    pq.write_table(table, tmp_path / 'ballots.parquet', row_group_size=333)
+
+    _check_chunks(tmp_path / 'ballots.arrow', chunk_size)
+    _check_chunks(tmp_path / 'ballots.parquet', chunk_size)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 256, 5000])
+def test_csv_and_npy_chunks(tmp_path, chunk_size):
+    np.savetxt(tmp_path / 'ballots.csv', SCORES, delimiter=',', fmt='%g')
+    np.save(tmp_path / 'ballots.npy', SCORES)
+
+    _check_chunks(tmp_path / 'ballots.csv', chunk_size)
+    _check_chunks(tmp_path / 'ballots.npy', chunk_size)
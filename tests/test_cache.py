@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import voting
+from benchmark import impartialCulture
+
+
+def _profile(seed, n_agents=30, n_alternatives=4):
+    return voting.PreferenceProfile(impartialCulture(n_agents, n_alternatives, seed=seed))
+
+
+def test_arguments_are_normalized():
+    cache = voting.ResultCache()
+    profile = _profile(1)
+    results = [cache.call(voting.borda, profile, 'max'), cache.call(voting.borda, profile, tieBreak='max'),
+               cache.call(voting.borda, profile), cache.call(voting.borda, profile, 'max', False)]
+    assert results == [voting.borda(profile)] * 4
+    assert (cache.hits, cache.misses) == (3, 1)
+
+    cache.call(voting.borda, profile, 'min')
+    assert cache.misses == 2
+
+
+def test_agent_tie_breakers_of_different_profiles():
+    first = voting.as_profile({1: [1, 2, 3], 2: [2, 1, 3], 3: [3, 1, 2], 4: [3, 2, 1]})
+    second = voting.as_profile({1: [2, 1, 3], 2: [1, 2, 3], 3: [3, 1, 2], 4: [3, 2, 1]})
+    cache = voting.ResultCache()
+    assert cache.call(voting.borda, first, voting.TieBreaker(1, first)) == 1
+    assert cache.call(voting.borda, first, voting.TieBreaker(1, second)) == 2
+
+
+def test_invalidate(tmp_path):
+    cache = voting.ResultCache(directory=tmp_path)
+    first, second = _profile(1), _profile(2)
+    for rule in (voting.plurality, voting.borda):
+        cache.call(rule, first)
+        cache.call(rule, second)
+
+    cache.invalidate(first)
+    restarted = voting.ResultCache(directory=tmp_path)
+    restarted.call(voting.borda, _profile(1))
+    restarted.call(voting.borda, _profile(2))
+    assert (restarted.disk_hits, restarted.misses) == (1, 1)
+
+    cache.invalidate()
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.pickle')] == []
+
+
+def test_invalidate_worksheet():
+    openpyxl = pytest.importorskip('openpyxl')
+    worksheet = openpyxl.Workbook().active
+    for row in ([3, 2, 1], [1, 3, 2]):
+        worksheet.append(row)
+
+    cache = voting.ResultCache()
+    assert cache.call(voting.rangeVoting, worksheet) == voting.rangeVoting(worksheet)
+    cache.invalidate(worksheet)
+
+
+def test_disk_is_bounded(tmp_path):
+    cache = voting.ResultCache(maxsize=2, directory=tmp_path, disk_maxsize=5)
+    profiles = [_profile(seed) for seed in range(6)]
+    for profile in profiles:
+        cache.call(voting.plurality, profile)
+
+    # one result and the position counts per profile
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.pickle')]) == 5
+
+    restarted = voting.ResultCache(directory=tmp_path)
+    assert restarted.call(voting.plurality, profiles[-1]) == voting.plurality(profiles[-1])
+    assert restarted.call(voting.plurality, profiles[0]) == voting.plurality(profiles[0])
+    assert (restarted.disk_hits, restarted.misses) == (1, 1)
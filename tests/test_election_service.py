@@ -0,0 +1,125 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import voting
+from benchmark import impartialCulture, rankingsToScores
+from election_service import ElectionService, InProcessClient, ServiceBusy
+
+SCORES = rankingsToScores(impartialCulture(500, 5, seed=3))
+BALLOTS = '\n'.join(','.join(str(int(score)) for score in row) for row in SCORES.tolist()).encode()
+
+
+def _counting_parses(service):
+    # count the files the service parses
+    parsed = []
+    parse = service._parse
+    service._parse = lambda path: (parsed.append(path), parse(path))[1]
+    return parsed
+
+
+def test_identical_concurrent_uploads_are_parsed_once():
+    async def run():
+        async with ElectionService() as service:
+            parsed = _counting_parses(service)
+            client = InProcessClient(service)
+            responses = await asyncio.gather(*[client.upload(BALLOTS, f'ballots{i}.csv') for i in range(4)])
+            assert all(response['ok'] for response in responses)
+            assert len({response['profile_id'] for response in responses}) == 1
+            assert len(parsed) == 1
+
+            # uploading it again later is not parsed either
+            assert (await client.upload(BALLOTS, 'again.csv'))['profile_id'] == responses[0]['profile_id']
+            assert len(parsed) == 1
+
+    asyncio.run(run())
+
+
+def test_batched_tallies_match_evaluate_all():
+    rules = ['plurality', 'borda', 'harmonic', 'STV', 'schulze', 'rangeVoting', 'borda']
+
+    async def run():
+        async with ElectionService() as service:
+            client = InProcessClient(service)
+            profile_id = (await client.upload(BALLOTS, 'ballots.csv'))['profile_id']
+
+            batches = []
+            evaluate_all = voting.evaluate_all
+
+            def counting(tally, batch, *args):
+                batches.append(batch)
+                return evaluate_all(tally, batch, *args)
+
+            voting.evaluate_all = counting
+            try:
+                responses = await asyncio.gather(*[client.tally(profile_id, rule) for rule in rules],
+                                                 client.tally(profile_id, 'borda', tieBreak='min'))
+            finally:
+                voting.evaluate_all = evaluate_all
+
+            assert batches == [['plurality', 'borda', 'harmonic', 'STV', 'schulze', 'rangeVoting'], ['borda']]
+            expected = voting.evaluate_all(SCORES, rules[:-1])
+            for rule, response in zip(rules, responses):
+                assert response == {'ok': True, 'result': expected[rule]}
+            assert responses[-1]['result'] == voting.evaluate_all(SCORES, ['borda'], 'min')['borda']
+
+    asyncio.run(run())
+
+
+def test_service_busy_without_waiting():
+    async def run():
+        async with ElectionService(max_pending=1, wait=False, batch_delay=0.05) as service:
+            profile_id = await service.upload(BALLOTS, 'ballots.csv')
+            results = await asyncio.gather(service.tally(profile_id, 'borda'), service.tally(profile_id, 'veto'),
+                                           return_exceptions=True)
+            assert isinstance(results[0], dict) and isinstance(results[1], ServiceBusy)
+
+            # the slot is free again once the first request is answered
+            assert await service.tally(profile_id, 'veto') == voting.evaluate_all(SCORES, ['veto'])['veto']
+
+    asyncio.run(run())
+
+
+def test_path_uploads(tmp_path):
+    inside = tmp_path / 'uploads'
+    inside.mkdir()
+    (inside / 'ballots.csv').write_bytes(BALLOTS)
+    (tmp_path / 'outside.csv').write_bytes(BALLOTS)
+    os.symlink(tmp_path / 'outside.csv', inside / 'link.csv')
+
+    async def run():
+        async with ElectionService(upload_directory=inside) as service:
+            client = InProcessClient(service)
+            assert (await client.upload(str(inside / 'ballots.csv')))['ok']
+            for path in (tmp_path / 'outside.csv', inside / '..' / 'outside.csv', inside / 'link.csv', __file__):
+                response = await client.upload(str(path))
+                assert response == {'ok': False,
+                                    'error': 'Uploads by path are only accepted from the upload directory.'}
+
+        async with ElectionService() as service:
+            response = await InProcessClient(service).upload(str(inside / 'ballots.csv'))
+            assert not response['ok']
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('request_, error', [
+    ({'action': 'tally', 'profile_id': 'missing', 'rule': 'borda'}, "Unknown profile 'missing'."),
+    ({'action': 'tally', 'rule': 'nope'}, "Unknown rule 'nope'."),
+    ({'action': 'upload', 'data': b'1,2', 'name': 'ballots.txt'}, "No ballots loader for '.txt' files."),
+    ({'action': 'vote'}, "Unknown action 'vote'."),
+])
+def test_errors(request_, error):
+    async def run():
+        async with ElectionService() as service:
+            client = InProcessClient(service)
+            request = dict(request_)
+            if request.get('action') == 'tally' and 'profile_id' not in request:
+                request['profile_id'] = (await client.upload(BALLOTS, 'ballots.csv'))['profile_id']
+            assert await client.request(request) == {'ok': False, 'error': error}
+
+    asyncio.run(run())
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmark import IMPORT_BUDGET, LAZY_MODULES, checkImportTime, importTime
+
+# extra seconds allowed on shared CI machines (where CI is set), whose timings are noisy
+CI_IMPORT_ALLOWANCE = 0.5
+
+
+@pytest.mark.parametrize('module', ['voting', 'election_service'])
+def test_import_loads_no_lazy_modules(module):
+    seconds, numpy_seconds, loaded = importTime(module, repeat=1)
+    assert loaded == []
+    assert seconds >= numpy_seconds > 0
+
+
+def test_import_within_budget():
+    budget = IMPORT_BUDGET + (CI_IMPORT_ALLOWANCE if os.environ.get('CI') else 0.0)
+    assert checkImportTime(budget=budget, repeat=3) == []
+
+
+def test_lazy_attribute_loads_on_use():
+    pytest.importorskip('openpyxl')
+    script = ('import sys, voting; before = "openpyxl" in sys.modules; voting.load_workbook; '
+              'print(before, "openpyxl" in sys.modules)')
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True,
+                            check=True).stdout.split()
+    assert output == ['False', 'True']
+
+
+def test_check_import_time_reports_lazy_modules():
+    # importing a lazy module directly has to be reported
+    problems = checkImportTime(budget=60, module=LAZY_MODULES[2], repeat=1)
+    assert problems == [f'importing {LAZY_MODULES[2]} loaded {LAZY_MODULES[2]}']
@@ -0,0 +1,195 @@
+"""
+    Differential tests of the array engine against plain dictionary implementations of the rules, written the way the
+    original voting.py computed them. Scores are summed as Fractions, so harmonic and fractional scoringRule ties are
+    exact here and in the engine (the original float sums could miss them)
+"""
+
+import os
+import sys
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import voting
+
+
+def _tie_key(tieBreak, preferences):
+    # sort key of an alternative, the smallest key wins the tie
+    if tieBreak == 'max':
+        return lambda alternative: -alternative
+    if tieBreak == 'min':
+        return lambda alternative: alternative
+    return preferences[tieBreak].index
+
+
+def _ranking(totals, tieBreak, preferences):
+    key = _tie_key(tieBreak, preferences)
+    return sorted(totals, key=lambda alternative: (-totals[alternative], key(alternative)))
+
+
+def _scores(preferences, scoreVector):
+    totals = {alternative: Fraction(0) for alternative in preferences[1]}
+    for ranking in preferences.values():
+        for alternative, score in zip(ranking, scoreVector):
+            totals[alternative] += score
+    return totals
+
+
+def _score_vector(rule, alt_len, scoreVector=None):
+    if rule == 'plurality':
+        return [1] + [0] * (alt_len - 1)
+    if rule == 'veto':
+        return [1] * (alt_len - 1) + [0]
+    if rule == 'borda':
+        return list(range(alt_len - 1, -1, -1))
+    if rule == 'harmonic':
+        return [Fraction(1, position) for position in range(1, alt_len + 1)]
+    return sorted((Fraction(str(score)) for score in scoreVector), reverse=True)
+
+
+def _stv(preferences, tieBreak):
+    remaining = set(preferences[1])
+    while True:
+        tops = {alternative: 0 for alternative in remaining}
+        for ranking in preferences.values():
+            tops[next(alternative for alternative in ranking if alternative in remaining)] += 1
+        fewest = min(tops.values())
+        left = {alternative for alternative in remaining if tops[alternative] > fewest}
+        if not left:
+            return min(remaining, key=_tie_key(tieBreak, preferences))
+        remaining = left
+
+
+def _pairwise(preferences):
+    alternatives = preferences[1]
+    wins = {a: {b: 0 for b in alternatives} for a in alternatives}
+    for ranking in preferences.values():
+        for i, a in enumerate(ranking):
+            for b in ranking[i + 1:]:
+                wins[a][b] += 1
+    return wins
+
+
+def _condorcet(preferences):
+    wins = _pairwise(preferences)
+    for a in wins:
+        if all(wins[a][b] > wins[b][a] for b in wins if b != a):
+            return a
+    return False
+
+
+def _copeland(preferences, tieBreak):
+    wins = _pairwise(preferences)
+    totals = {a: sum(1 if wins[a][b] > wins[b][a] else Fraction(1, 2) if wins[a][b] == wins[b][a] else 0
+                     for b in wins if b != a) for a in wins}
+    return _ranking(totals, tieBreak, preferences)[0]
+
+
+def _schulze(preferences, tieBreak):
+    wins = _pairwise(preferences)
+    strength = {a: {b: wins[a][b] if wins[a][b] > wins[b][a] else 0 for b in wins} for a in wins}
+    for i in wins:
+        for a in wins:
+            for b in wins:
+                if a != b and i not in (a, b):
+                    strength[a][b] = max(strength[a][b], min(strength[a][i], strength[i][b]))
+    unbeaten = [a for a in wins if not any(strength[b][a] > strength[a][b] for b in wins if b != a)]
+    return min(unbeaten, key=_tie_key(tieBreak, preferences))
+
+
+def _kemeny(preferences, tieBreak):
+    # the local search kemeny documents: start from the borda ranking and swap neighbours a majority ranks the other way
+    wins = _pairwise(preferences)
+    order = _ranking(_scores(preferences, _score_vector('borda', len(preferences[1]))), tieBreak, preferences)
+    swapped = True
+    while swapped:
+        swapped = False
+        for i in range(len(order) - 1):
+            if wins[order[i + 1]][order[i]] > wins[order[i]][order[i + 1]]:
+                order[i], order[i + 1] = order[i + 1], order[i]
+                swapped = True
+    return order[0]
+
+
+def _profiles():
+    # small profiles drawn from a few distinct rankings, so ties and repeated ballots (for compress) are common
+    for seed in range(60):
+        rng = np.random.default_rng(seed)
+        n_agents, alt_len = int(rng.integers(1, 14)), int(rng.integers(2, 6))
+        rankings = [(rng.permutation(alt_len) + 1).tolist() for _ in range(int(rng.integers(1, 5)))]
+        preferences = {agent: list(rankings[int(rng.integers(len(rankings)))]) for agent in range(1, n_agents + 1)}
+        yield seed, preferences
+
+
+PROFILES = list(_profiles())
+
+
+@pytest.fixture(params=[False, True], ids=['profile', 'compressed'])
+def compress(request):
+    return request.param
+
+
+def _as_tested(preferences, compress):
+    profile = voting.PreferenceProfile.from_dict(preferences)
+    return profile.compress() if compress else profile
+
+
+def _tie_breaks(preferences):
+    return ['max', 'min', 1, len(preferences)]
+
+
+@pytest.mark.parametrize('seed, preferences', PROFILES, ids=[str(seed) for seed, _ in PROFILES])
+def test_scoring_rules(seed, preferences, compress):
+    profile = _as_tested(preferences, compress)
+    alt_len = len(preferences[1])
+    fractional = [round(0.7 ** position, 2) for position in range(alt_len)]
+
+    for tieBreak in _tie_breaks(preferences):
+        for rule in ('plurality', 'veto', 'borda', 'harmonic'):
+            expected = _ranking(_scores(preferences, _score_vector(rule, alt_len)), tieBreak, preferences)
+            winner, _, ranking = getattr(voting, rule)(profile, tieBreak, full=True)
+            assert (winner, ranking) == (expected[0], expected), rule
+            assert getattr(voting, rule)(preferences, tieBreak) == expected[0], rule
+
+        for scoreVector in (fractional, list(range(alt_len))):
+            expected = _ranking(_scores(preferences, _score_vector('scoringRule', alt_len, scoreVector)), tieBreak,
+                                preferences)
+            assert voting.scoringRule(profile, scoreVector, tieBreak, full=True)[2] == expected
+            assert voting.scoringRule(preferences, scoreVector, tieBreak) == expected[0]
+
+
+@pytest.mark.parametrize('seed, preferences', PROFILES, ids=[str(seed) for seed, _ in PROFILES])
+def test_ranked_rules(seed, preferences, compress):
+    profile = _as_tested(preferences, compress)
+
+    for tieBreak in _tie_breaks(preferences):
+        assert voting.STV(profile, tieBreak) == _stv(preferences, tieBreak)
+        assert voting.copeland(profile, tieBreak) == _copeland(preferences, tieBreak)
+        assert voting.schulze(profile, tieBreak) == _schulze(preferences, tieBreak)
+        assert voting.kemeny(profile, tieBreak) == _kemeny(preferences, tieBreak)
+
+    assert voting.condorcet(profile) == _condorcet(preferences)
+    for agent in preferences:
+        assert voting.dictatorship(profile, agent) == preferences[agent][0]
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_range_voting(seed):
+    rng = np.random.default_rng(seed)
+    scores = np.round(rng.random((int(rng.integers(1, 12)), int(rng.integers(2, 6)))) * 4) / 4
+    preferences = voting.generatePreferences(scores)
+
+    totals = {alternative: sum(Fraction(float(score)) for score in column)
+              for alternative, column in enumerate(scores.T.tolist(), 1)}
+    for tieBreak in _tie_breaks(preferences):
+        assert voting.rangeVoting(scores, tieBreak) == _ranking(totals, tieBreak, preferences)[0]
+
+
+def test_invalid_tie_breaks():
+    preferences = PROFILES[0][1]
+    for rule in (voting.plurality, voting.borda, voting.STV, voting.schulze):
+        assert rule(preferences, 'foo') is False
+        assert rule(preferences, len(preferences) + 1) is False
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import voting
+from benchmark import impartialCulture
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+@pytest.mark.parametrize('compress', [False, True])
+def test_sweep_matches_the_rules(processes, compress):
+    preferences = {agent: (ranking + 1).tolist()
+                   for agent, ranking in zip(range(3, 60, 3), impartialCulture(19, 4, seed=5))}
+    profile = voting.as_profile(preferences)
+    if compress:
+        profile = profile.compress()
+
+    tieBreaks = ['max', 'MIN', 3, 57, voting.TieBreaker(30, profile), 'foo', 4, 99]
+    table = voting.sweep(profile, tieBreaks=tieBreaks, scoreVectors=[[1, 1, 0, 0]], processes=processes, batch_size=3)
+
+    assert len(table) == 6 * len(tieBreaks)
+    for row in table:
+        if row['rule'] == 'scoringRule':
+            expected = voting.scoringRule(preferences, row['scoreVector'], row['tieBreak'])
+        else:
+            expected = getattr(voting, row['rule'])(preferences, row['tieBreak'])
+        assert row['winner'] == expected
+
+
+def test_sweep_reports_invalid_tie_breaks_with_one_candidate():
+    # every agent ranks 1 first, so there is never a tie to break
+    preferences = {1: [1, 2, 3], 2: [1, 3, 2], 3: [1, 2, 3]}
+    table = voting.sweep(preferences, rules=['plurality'], tieBreaks=['foo', 99, 'max', 2], processes=1)
+    assert [row['winner'] for row in table] == [False, False, 1, 1]
+    assert voting.plurality(preferences, 'foo') is False and voting.plurality(preferences, 99) is False
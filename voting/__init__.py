@@ -0,0 +1,29 @@
+# Andrew Frisby
+
+# the voting functions are split into modules by stage: ballots parsing (ballots), ranked profiles (profile), tie breaking
+# (tiebreak), the voting rules (rules), tallies of ballots sources and multi-rule evaluation (tally), parallel sweeps
+# (parallel), memoized results (cache), manipulability analysis (manipulation) and the opt-in instrumentation
+# (instrumentation). Everything is importable from voting directly. Only numpy is imported up front: openpyxl, pyarrow
+# and the process pool are imported by the functions that use them, so scripts that never touch a workbook do not pay
+# for importing them
+
+from .instrumentation import Instrumentation, instrument
+from .ballots import (generatePreferences, rankScores, registerLoader, iterScoreChunks, loadScores, convertBallots,
+                      iterRankChunks)
+from .profile import PreferenceProfile, as_profile
+from .tiebreak import tieBreakMax, tieBreakMin, tieBreakAgent, TieBreaker, tie_breaker, flatten, counting
+from .rules import (scoreTally, dictatorship, scoringRule, plurality, veto, borda, harmonic, STV, pairwiseMatrix,
+                    condorcet, copeland, schulze, kemeny)
+from .tally import rangeVoting, BallotTally, evaluate_all
+from .parallel import sweep
+from .cache import ResultCache
+from .manipulation import manipulability
+
+
+def __getattr__(name):
+    # voting.load_workbook used to be imported with the module, it is now only imported when asked for
+    if name == 'load_workbook':
+        from openpyxl import load_workbook
+
+        return load_workbook
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,335 @@
+# os is used to pick a ballots loader from the file extension, csv to stream comma separated ballots files. openpyxl and
+# pyarrow are only imported by the loaders that need them
+import os
+import csv
+
+# numpy holds the preference scores and rankings as contiguous arrays
+import numpy as np
+
+from . import instrumentation
+from .instrumentation import _timed, _timed_chunks
+
+
+def _rank_dtype(alt_len):
+    """
+        _rank_dtype will return the smallest unsigned integer dtype that can hold an alternative index or rank position
+
+        Parameters:
+            alt_len: int - number of alternatives in the profile
+
+        Return:
+            numpy dtype
+    """
+
+    if alt_len <= np.iinfo(np.uint8).max + 1:
+        return np.uint8
+    elif alt_len <= np.iinfo(np.uint16).max + 1:
+        return np.uint16
+    return np.uint32
+
+
+@_timed('generatePreferences')
+def generatePreferences(values):
+    """
+        generatePreferences will take an openpyxl worksheet with each agent's preference scores and return a dictionary with
+        the ranked preferences for each agent. This dictionary will be used in the voting functions.
+
+        Parameters:
+            values: openpyxl worksheet - worksheet where the columns are the alternatives and the rows are the agents.
+            Each cell contains that agent's preference score for the corrsponding alternative.
+        
+        Return:
+            pref_dict: dictionary - dictionary where the keys are the agent's numbers (integers) and the values are the 
+            ordered lists of the agents' preferred alternatives (also integers). Example: {1:[2,1,3,4], 2:[4,1,3,2], ...}
+    """
+
+    # creating empty dictionary which will be populated with each agent's alternative preference order and returned at the end
+    pref_dict = {}
+
+    # the worksheet is read in chunks of rows, and each chunk is ranked at once by rankScores (sorted by the preference 
+    # score first, then the alternative value, so the higher alternative is selected when preference scores are equivalent)
+    for rankings in iterRankChunks(values):
+
+        # rankings holds alternative indices, adding 1 turns them into the alternative numbers
+        for ranking in (rankings.astype(np.int64) + 1).tolist():
+            pref_dict[len(pref_dict) + 1] = ranking
+
+    return pref_dict
+
+
+@_timed('rankScores')
+def rankScores(scores):
+    """
+        rankScores will rank every row of a preference score matrix the same way generatePreferences does: highest score 
+        first, and the higher alternative first when preference scores are equivalent
+
+        Parameters:
+            scores: array-like of shape (agents, alternatives) - each agent's preference score for each alternative
+
+        Return:
+            rankings: numpy array of shape (agents, alternatives) - each agent's alternatives as indices (0 = first
+            alternative), most preferred first
+    """
+
+    scores = np.asarray(scores, dtype=float)
+    alt_idx = np.broadcast_to(np.arange(scores.shape[-1]), scores.shape)
+
+    # lexsort orders by score and then by alternative, both ascending, so reversing each row gives the highest score
+    # first with the higher alternative winning ties
+    rankings = np.lexsort((alt_idx, scores), axis=-1)[:, ::-1]
+    return rankings.astype(_rank_dtype(scores.shape[-1]))
+
+
+def _chunk_rows(rows, chunk_size):
+    """
+        _chunk_rows will group an iterable of rows of preference scores into numpy arrays of chunk_size rows
+
+        Parameters:
+            rows: iterable of sequences - one sequence of preference scores per agent
+
+            chunk_size: int - number of agents (rows) in each chunk
+        
+        Return:
+            generator of numpy arrays of shape (chunk_size, alternatives) - the last chunk may be shorter
+    """
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield np.array(chunk, dtype=float)
+            chunk = []
+    if chunk:
+        yield np.array(chunk, dtype=float)
+
+
+def _iter_workbook_scores(source, chunk_size):
+    """
+        _iter_workbook_scores will stream the rows of an xlsx ballots workbook (its active sheet) or of an already loaded 
+        openpyxl worksheet. Workbook files are opened read-only, which parses rows lazily instead of building every cell up front
+    """
+
+    workbook = None
+    if hasattr(source, 'iter_rows'):
+        values = source
+    else:
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        values = workbook.active
+
+    try:
+        yield from _chunk_rows(values.iter_rows(values_only=True), chunk_size)
+    finally:
+        if workbook is not None:
+            workbook.close()
+
+
+def _iter_csv_scores(source, chunk_size):
+    """
+        _iter_csv_scores will stream the rows of a csv ballots file. Like the xlsx input, the file has no header row or agent 
+        column, only one row of preference scores per agent
+    """
+
+    with open(source, newline='') as ballots:
+        yield from _chunk_rows((row for row in csv.reader(ballots) if row), chunk_size)
+
+
+def _iter_array_scores(scores, chunk_size):
+    """
+        _iter_array_scores will yield consecutive row slices of a score matrix. Slices of a memory-mapped array are views, 
+        so the data is only read from disk when a chunk is used
+    """
+
+    for start in range(0, len(scores), chunk_size):
+        yield scores[start:start + chunk_size]
+
+
+def _iter_npy_scores(source, chunk_size):
+    """
+        _iter_npy_scores will stream a .npy score matrix of shape (agents, alternatives) through a read-only memory map
+    """
+
+    yield from _iter_array_scores(np.load(source, mmap_mode='r'), chunk_size)
+
+
+def _iter_arrow_batches(batches, chunk_size):
+    """
+        _iter_arrow_batches will turn pyarrow record batches, where each column is an alternative, into score chunks of 
+        chunk_size rows. The batches can have any size, the rows left over from one are carried into the next chunk
+    """
+
+    leftover = None
+    for batch in batches:
+        scores = np.column_stack([column.to_numpy(zero_copy_only=False) for column in batch.columns]).astype(float)
+        if leftover is not None:
+            scores = np.concatenate([leftover, scores])
+
+        full = len(scores) - len(scores) % chunk_size
+        yield from _iter_array_scores(scores[:full], chunk_size)
+        leftover = scores[full:]
+
+    if leftover is not None and len(leftover):
+        yield leftover
+
+
+def _iter_parquet_scores(source, chunk_size):
+    """
+        _iter_parquet_scores will stream a parquet ballots file batch by batch. Requires pyarrow
+    """
+
+    import pyarrow.parquet as pq
+
+    yield from _iter_arrow_batches(pq.ParquetFile(source).iter_batches(batch_size=chunk_size), chunk_size)
+
+
+def _iter_arrow_scores(source, chunk_size):
+    """
+        _iter_arrow_scores will stream an Arrow IPC (feather version 2) ballots file batch by batch. Requires pyarrow
+    """
+
+    import pyarrow as pa
+
+    with pa.memory_map(str(source)) as ballots:
+        reader = pa.ipc.open_file(ballots)
+        yield from _iter_arrow_batches((reader.get_batch(i) for i in range(reader.num_record_batches)), chunk_size)
+
+
+# ballots loaders keyed by file extension. Each one takes the file and a chunk size and yields numpy score arrays of shape
+# (chunk_size, alternatives). New formats can be added with registerLoader
+_LOADERS = {
+    '.xlsx': _iter_workbook_scores,
+    '.xlsm': _iter_workbook_scores,
+    '.csv': _iter_csv_scores,
+    '.npy': _iter_npy_scores,
+    '.parquet': _iter_parquet_scores,
+    '.arrow': _iter_arrow_scores,
+    '.feather': _iter_arrow_scores,
+}
+
+
+def registerLoader(extension, loader):
+    """
+        registerLoader will add (or replace) the ballots loader used for files with the given extension
+
+        Parameters:
+            extension: str - the file extension, for example '.tsv'
+
+            loader: function - loader(source, chunk_size) that yields numpy arrays of preference scores of shape 
+            (chunk_size, alternatives), where the columns are the alternatives and the rows are the agents
+    """
+
+    _LOADERS[extension.lower()] = loader
+
+
+def iterScoreChunks(source, chunk_size=10000):
+    """
+        iterScoreChunks will stream the preference scores of a ballots file in fixed-size chunks of rows, so that a large
+        file never has to be held in memory at once. The loader is picked from the file extension: .xlsx/.xlsm (read-only 
+        openpyxl), .csv, .npy (memory-mapped), .parquet and .arrow/.feather (pyarrow), plus any added with registerLoader
+
+        Parameters:
+            source: str, path, openpyxl worksheet or numpy array - the ballots file, an already loaded worksheet or a score 
+            matrix, where the columns are the alternatives and the rows are the agents
+
+            chunk_size: int, default=10000 - number of agents (rows) in each chunk
+        
+        Return:
+            generator of numpy arrays of shape (chunk_size, alternatives) - the last chunk may be shorter
+    """
+
+    if hasattr(source, 'iter_rows'):
+        chunks = _iter_workbook_scores(source, chunk_size)
+
+    elif isinstance(source, np.ndarray):
+        chunks = _iter_array_scores(source, chunk_size)
+
+    else:
+        extension = os.path.splitext(str(source))[1].lower()
+        if extension not in _LOADERS:
+            raise ValueError(f'No ballots loader for {extension!r} files.')
+        chunks = _LOADERS[extension](source, chunk_size)
+
+    # the parsing happens while the chunks are pulled, so it is timed chunk by chunk
+    return chunks if instrumentation._instrumentation is None else _timed_chunks('parse ballots', chunks)
+
+
+def loadScores(source):
+    """
+        loadScores will load the whole preference score matrix of a ballots file. A .npy file is memory-mapped read-only, 
+        so no copy of the matrix is made
+
+        Parameters:
+            source: str, path or openpyxl worksheet - see iterScoreChunks
+
+        Return:
+            scores: numpy array of shape (agents, alternatives)
+    """
+
+    if not hasattr(source, 'iter_rows') and str(source).lower().endswith('.npy'):
+        return np.load(source, mmap_mode='r')
+
+    return np.concatenate(list(iterScoreChunks(source)))
+
+
+def convertBallots(source, destination, chunk_size=10000):
+    """
+        convertBallots will convert a ballots file (for example an xlsx profile) into a .npy score matrix, so later runs can 
+        memory-map it with loadScores/iterScoreChunks instead of parsing the workbook again. The number of agents is only 
+        known once the file is parsed, so the chunks are streamed to a temporary file next to the destination and then 
+        copied into a memory-mapped .npy file, without ever holding the whole matrix in memory
+
+        Parameters:
+            source: str, path or openpyxl worksheet - see iterScoreChunks
+
+            destination: str or path - the .npy file to write
+
+            chunk_size: int, default=10000 - number of agents (rows) read at a time
+
+        Return:
+            destination: str or path
+    """
+
+    if not str(destination).lower().endswith('.npy'):
+        raise ValueError('Ballots can only be converted to a .npy file.')
+
+    import tempfile
+
+    dtype, n_rows, n_columns = None, 0, 0
+    directory = os.path.dirname(os.path.abspath(destination))
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.scores', delete=False) as raw:
+        for scores in iterScoreChunks(source, chunk_size):
+            dtype = dtype or scores.dtype
+            n_rows, n_columns = n_rows + len(scores), scores.shape[1]
+            raw.write(np.ascontiguousarray(scores, dtype=dtype).tobytes())
+
+    try:
+        matrix = np.lib.format.open_memmap(destination, mode='w+', dtype=dtype or float, shape=(n_rows, n_columns))
+        if n_rows:
+            parsed = np.memmap(raw.name, dtype=dtype, mode='r', shape=(n_rows, n_columns))
+            for start in range(0, n_rows, chunk_size):
+                matrix[start:start + chunk_size] = parsed[start:start + chunk_size]
+            del parsed
+        matrix.flush()
+        del matrix
+    finally:
+        os.remove(raw.name)
+
+    return destination
+
+
+def iterRankChunks(source, chunk_size=10000):
+    """
+        iterRankChunks will stream the ranked preferences of a ballots file in fixed-size chunks of agents
+
+        Parameters:
+            source: str, path, openpyxl worksheet or numpy array - see iterScoreChunks
+
+            chunk_size: int, default=10000 - number of agents (rows) in each chunk
+        
+        Return:
+            generator of numpy arrays of shape (chunk_size, alternatives) - see rankScores
+    """
+
+    for scores in iterScoreChunks(source, chunk_size):
+        yield rankScores(scores)
@@ -0,0 +1,280 @@
+# batch runs the voting rules on many ballots files from the command line. Every file is parsed and tallied by a worker
+# process, so parsing one file overlaps with voting on the others, and each file's results are written as soon as it
+# finishes, as JSON lines or csv rows. Rerunning with --resume skips the files whose results are already in the output.
+#
+#     python -m voting ballots/*.xlsx nightly/ --rules plurality borda STV --tie-breaks max min 1 --output results.jsonl
+#     python -m voting ballots/*.xlsx nightly/ --rules plurality borda STV --output results.jsonl --resume
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+
+from .ballots import _LOADERS
+from .tally import BallotTally, evaluate_all
+
+
+# columns of the csv output. The scores of every alternative are only written to JSON lines
+CSV_FIELDS = ('file', 'rule', 'tieBreak', 'winner', 'ranking', 'error')
+
+
+def findBallots(inputs, recursive=False):
+    """
+        findBallots will expand files, directories and glob patterns into a sorted list of ballots files. Directories
+        contribute the files with an extension that has a ballots loader (see registerLoader)
+
+        Parameters:
+            inputs: list - file names, directory names or glob patterns
+
+            recursive: bool, default=False - also search the subdirectories of directories (and ** in patterns)
+
+        Return:
+            files: list - the ballots files, without duplicates
+    """
+
+    files = set()
+    for source in inputs:
+        if os.path.isdir(source):
+            pattern = os.path.join(source, '**', '*') if recursive else os.path.join(source, '*')
+            files.update(name for name in glob.glob(pattern, recursive=recursive)
+                         if os.path.isfile(name) and os.path.splitext(name)[1].lower() in _LOADERS)
+        elif os.path.isfile(source):
+            files.add(source)
+        else:
+            files.update(name for name in glob.glob(source, recursive=recursive) if os.path.isfile(name))
+
+    return sorted(files)
+
+
+def _tie_break(value):
+    # tie breaks are given as 'max', 'min' or the number of the tie breaking agent
+    return int(value) if value.lstrip('-').isdigit() else value
+
+
+def runFile(filename, rules, tieBreaks=('max',), scoreVector=None, agent=1, k=None):
+    """
+        runFile will parse one ballots file and run every rule with every tie break on it. Errors are returned as a
+        record instead of being raised, so one bad file does not stop a batch
+
+        Parameters:
+            filename: str - the ballots file
+
+            rules: list - names of the voting functions, see evaluate_all
+
+            tieBreaks: list, default=('max',) - the tie breaks to use
+
+            scoreVector: list, default=None - the scores for 'scoringRule'
+
+            agent: int, default=1 - the dictator for 'dictatorship'
+
+            k: int, default=None - number of alternatives in each ranking. None ranks all of them
+
+        Return:
+            records: list - one dictionary per rule and tie break with the 'file', 'rule', 'tieBreak', 'winner', 'scores'
+            and 'ranking', or a single {'file', 'error'} dictionary
+    """
+
+    try:
+        # the file is parsed once, and the rules share its tallies across tie breaks
+        tally = BallotTally.from_source(filename)
+        records = []
+        for tieBreak in tieBreaks:
+            results = evaluate_all(tally, rules, tieBreak, scoreVector, agent, k)
+            for rule in rules:
+                records.append({'file': filename, 'rule': rule, 'tieBreak': tieBreak, **results[rule]})
+        return records
+
+    except Exception as error:
+        return [{'file': filename, 'error': f'{type(error).__name__}: {error}'}]
+
+
+def _json_value(value):
+    # numpy numbers and arrays in the results are written as plain JSON numbers and lists
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+class _Output:
+    """
+        _Output appends records to a JSON lines or csv results file, and reads back which files it already holds
+    """
+
+    def __init__(self, path, format=None):
+        self.path = path
+        self.format = format or ('csv' if str(path).lower().endswith('.csv') else 'jsonl')
+        self.stream = None
+
+    def completed(self, expected):
+        """
+            completed will return the files that have all their expected records in the results file, without errors. A
+            line cut off by a crash is removed, so the file can be appended to again
+        """
+
+        if self.path is None or not os.path.exists(self.path):
+            return set()
+
+        with open(self.path, 'rb+') as results:
+            data = results.read()
+            end = data.rfind(b'\n') + 1
+            if end < len(data):
+                results.truncate(end)
+        lines = data[:end].decode().splitlines()
+
+        counts = {}
+        failed = set()
+        if self.format == 'csv':
+            rows = list(csv.DictReader(lines))
+        else:
+            rows = [json.loads(line) for line in lines if line.strip()]
+        # a file that failed and was run again by an earlier resume counts from its last run
+        for row in rows:
+            if row.get('error'):
+                failed.add(row['file'])
+                counts[row['file']] = 0
+            else:
+                failed.discard(row['file'])
+                counts[row['file']] = counts.get(row['file'], 0) + 1
+
+        return {name for name, count in counts.items() if count >= expected and name not in failed}
+
+    def open(self, append):
+        if self.path is None:
+            self.stream = sys.stdout
+            self._writer = csv.DictWriter(self.stream, CSV_FIELDS, extrasaction='ignore')
+            if self.format == 'csv':
+                self._writer.writeheader()
+            return
+
+        new = not (append and os.path.exists(self.path) and os.path.getsize(self.path))
+        self.stream = open(self.path, 'w' if new else 'a', newline='')
+        self._writer = csv.DictWriter(self.stream, CSV_FIELDS, extrasaction='ignore')
+        if self.format == 'csv' and new:
+            self._writer.writeheader()
+
+    def write(self, records):
+        # all the records of a file are written and flushed together, so a crash leaves at most one cut off line
+        if self.format == 'csv':
+            for record in records:
+                ranking = record.get('ranking')
+                self._writer.writerow({**record, 'ranking': ' '.join(map(str, ranking)) if ranking else ''})
+        else:
+            self.stream.write(''.join(json.dumps(record, default=_json_value) + '\n' for record in records))
+        self.stream.flush()
+
+    def close(self):
+        if self.stream is not None and self.stream is not sys.stdout:
+            self.stream.close()
+
+
+def runBatch(files, rules, tieBreaks=('max',), scoreVector=None, agent=1, k=None, output=None, format=None,
+             workers=None, resume=False, progress=None):
+    """
+        runBatch will run the rules on every ballots file, writing each file's results as soon as it is done. With more
+        than one worker the files are parsed and tallied in a process pool, so parsing overlaps with voting
+
+        Parameters:
+            files: list - the ballots files, see findBallots
+
+            rules: list - names of the voting functions, see evaluate_all
+
+            tieBreaks: list, default=('max',) - the tie breaks to use
+
+            scoreVector: list, default=None - the scores for 'scoringRule'
+
+            agent: int, default=1 - the dictator for 'dictatorship'
+
+            k: int, default=None - number of alternatives in each ranking. None ranks all of them
+
+            output: str, default=None - the results file. None writes to stdout
+
+            format: str, default=None - 'jsonl' or 'csv'. None picks csv for .csv output files and JSON lines otherwise
+
+            workers: int, default=None - number of worker processes. None uses every core, 1 runs in this process
+
+            resume: bool, default=False - append to the output and skip the files that already have all their results.
+            Files that failed are run again
+
+            progress: function, default=None - called with (filename, records) after each file
+
+        Return:
+            (done, failed): (int, list) - number of files run and the files that failed
+    """
+
+    output = _Output(output, format)
+    expected = len(rules) * len(tieBreaks)
+    if resume:
+        skipped = output.completed(expected)
+        files = [name for name in files if name not in skipped]
+
+    workers = min(workers or os.cpu_count() or 1, max(1, len(files)))
+    failed = []
+
+    def finish(filename, records):
+        output.write(records)
+        if 'error' in records[0]:
+            failed.append(filename)
+        if progress is not None:
+            progress(filename, records)
+
+    output.open(append=resume)
+    try:
+        if workers == 1:
+            for filename in files:
+                finish(filename, runFile(filename, rules, tieBreaks, scoreVector, agent, k))
+        else:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+
+            with ProcessPoolExecutor(workers) as pool:
+                futures = {pool.submit(runFile, filename, rules, tieBreaks, scoreVector, agent, k): filename
+                           for filename in files}
+                for future in as_completed(futures):
+                    try:
+                        records = future.result()
+                    except Exception as error:
+                        # a worker that died (for example out of memory) takes its file with it
+                        records = [{'file': futures[future], 'error': f'{type(error).__name__}: {error}'}]
+                    finish(futures[future], records)
+    finally:
+        output.close()
+
+    return len(files), failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m voting',
+                                     description='Run voting rules on many ballots files.')
+    parser.add_argument('inputs', nargs='+', help='ballots files, directories or glob patterns')
+    parser.add_argument('--rules', nargs='+', default=['plurality', 'veto', 'borda', 'harmonic', 'STV'])
+    parser.add_argument('--tie-breaks', nargs='+', type=_tie_break, default=['max'],
+                        help="'max', 'min' or the number of a tie breaking agent")
+    parser.add_argument('--score-vector', type=float, nargs='+', help="the scores for 'scoringRule'")
+    parser.add_argument('--agent', type=int, default=1, help="the dictator for 'dictatorship'")
+    parser.add_argument('--k', type=int, help='number of alternatives in each ranking, default is all of them')
+    parser.add_argument('--recursive', action='store_true', help='search the subdirectories of directories')
+    parser.add_argument('--output', help='results file (.jsonl or .csv), default is stdout')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help='default is picked from the output extension')
+    parser.add_argument('--workers', type=int, help='number of worker processes, default is every core')
+    parser.add_argument('--resume', action='store_true',
+                        help='append to the output and skip the files that already have their results')
+    parser.add_argument('--quiet', action='store_true', help='do not report progress on stderr')
+    args = parser.parse_args(argv)
+
+    files = findBallots(args.inputs, args.recursive)
+    if not files:
+        print('No ballots files found.', file=sys.stderr)
+        return 1
+
+    progress = None
+    if not args.quiet:
+        progress = lambda filename, records: print(
+            f"{filename}: {records[0]['error'] if 'error' in records[0] else 'done'}", file=sys.stderr)
+
+    done, failed = runBatch(files, args.rules, args.tie_breaks, args.score_vector, args.agent, args.k, args.output,
+                            args.format, args.workers, args.resume, progress)
+
+    if not args.quiet:
+        print(f'{done} files run, {len(failed)} failed, {len(files) - done} already done.', file=sys.stderr)
+    return 1 if failed else 0
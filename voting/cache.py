@@ -0,0 +1,336 @@
+# os and hashlib name the files of the on-disk tier (hashlib is imported by the functions that use it), OrderedDict keeps 
+# the least recently used order, pickle and copy store and hand out the results
+import os
+import pickle
+import copy
+from collections import OrderedDict
+from functools import wraps
+
+import numpy as np
+
+from .profile import PreferenceProfile, as_profile
+from .tiebreak import TieBreaker
+
+
+def _cache_key(value):
+    """
+        _cache_key will turn a rule argument into a hashable value with a stable repr, for the keys of ResultCache
+    """
+
+    if isinstance(value, TieBreaker):
+        # an agent tie break depends on the profile it was built from through the agent's ranking
+        if value.alternatives is None:
+            return ('TieBreaker', value.tieBreak)
+        return ('TieBreaker', value.tieBreak, tuple(value.alternatives.tolist()), tuple(value._positions.tolist()))
+    if isinstance(value, np.ndarray):
+        return tuple(value.tolist())
+    if isinstance(value, (list, tuple)):
+        return tuple(_cache_key(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _cache_key(item)) for key, item in value.items()))
+    return value
+
+
+# the signature of every rule called through a ResultCache
+_signatures = {}
+
+
+def _rule_arguments(rule, args, kwargs):
+    """
+        _rule_arguments will return the arguments of a rule after its profile by name, with the defaults filled in, so 
+        calls that pass the same arguments by position, by keyword or by default share one cache key
+    """
+
+    if rule not in _signatures:
+        import inspect
+
+        _signatures[rule] = inspect.signature(rule)
+
+    try:
+        bound = _signatures[rule].bind(None, *args, **kwargs)
+    except TypeError:
+        # the rule will raise the error itself
+        return _cache_key(args), _cache_key(kwargs)
+
+    bound.apply_defaults()
+    return tuple((name, _cache_key(value)) for name, value in list(bound.arguments.items())[1:])
+
+
+class ResultCache:
+    """
+        ResultCache memoizes the results of the voting functions, keyed by the fingerprint of the profile, the rule and its 
+        other arguments (scoreVector, tieBreak, ...). It keeps at most maxsize results in memory and drops the least 
+        recently used ones first. With a directory it also stores every result on disk, so results survive a restart, and
+        keeps at most disk_maxsize files there, again dropping the least recently used ones first.
+        The intermediate tallies of a profile (position counts and pairwise matrix) are cached as well, and handed to new
+        PreferenceProfile objects with the same content
+
+        Example:
+            cache = ResultCache(maxsize=256, directory='vote_cache')
+            winner = cache.call(borda, preferences, 'max')
+            cached_borda = cache.wrap(borda)
+
+        Attributes:
+            hits: int - calls answered from memory
+
+            disk_hits: int - calls answered from the directory
+
+            misses: int - calls where the rule had to run
+    """
+
+    def __init__(self, maxsize=1024, directory=None, disk_maxsize=65536):
+        """
+            Parameters:
+                maxsize: int, default=1024 - maximum number of results (and profile tallies) kept in memory
+
+                directory: str or path, default=None - directory for the on-disk tier. None keeps results in memory only
+
+                disk_maxsize: int, default=65536 - maximum number of results (and profile tallies) kept in the directory.
+                None does not limit the directory
+        """
+
+        self.maxsize = maxsize
+        self.directory = directory
+        self.disk_maxsize = disk_maxsize
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+        # the last dictionary of preferences, a copy of its content and its profile, so calls on the same dictionary
+        # only compare it instead of converting and hashing it again
+        self._last_dict = None
+
+        # number of files in the directory, counted when the first new file is written
+        self._disk_size = None
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def _source_fingerprint(self, source):
+        """
+            _source_fingerprint will fingerprint the first argument of a rule: a profile by its content, a ballots file by 
+            its path, size and modification time. Returns None for inputs that cannot be fingerprinted (worksheets)
+        """
+
+        return self._source(source)[0]
+
+    def _source(self, source):
+        """
+            _source will return the fingerprint of the first argument of a rule and the argument to run the rule on: a 
+            dictionary is converted to a PreferenceProfile once, and reused while its content does not change
+        """
+
+        if isinstance(source, dict):
+            if self._last_dict is not None and self._last_dict[0] is source:
+                content, profile = self._last_dict[1:]
+                if len(content) == len(source) and all(tuple(ranking) == content.get(agent)
+                                                       for agent, ranking in source.items()):
+                    return profile.fingerprint(), profile
+
+            profile = as_profile(source)
+            self._last_dict = (source, {agent: tuple(ranking) for agent, ranking in source.items()}, profile)
+            return profile.fingerprint(), profile
+
+        if isinstance(source, PreferenceProfile):
+            return source.fingerprint(), source
+
+        if isinstance(source, (str, os.PathLike)) and os.path.isfile(source):
+            status = os.stat(source)
+            return f'file:{os.path.abspath(source)}:{status.st_size}:{status.st_mtime_ns}', source
+
+        return None, source
+
+    def _prefix(self, fingerprint):
+        # the files of a profile start with a hash of its fingerprint, so invalidate can find them
+        import hashlib
+
+        return hashlib.blake2b(fingerprint.encode(), digest_size=10).hexdigest() + '-'
+
+    def _path(self, key):
+        import hashlib
+
+        name = self._prefix(key[0]) + hashlib.blake2b(repr(key).encode(), digest_size=20).hexdigest() + '.pickle'
+        return os.path.join(self.directory, name)
+
+    def get(self, key, count=True):
+        """
+            get will return the cached value of a key, looking in memory first and then on disk
+
+            Parameters:
+                key: tuple - (fingerprint, ...)
+
+                count: bool, default=True - whether the lookup counts towards the hits and misses
+
+            Return:
+                (found, value): (bool, object)
+        """
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += count
+            return True, self._entries[key]
+
+        if self.directory is not None and os.path.exists(self._path(key)):
+            with open(self._path(key), 'rb') as cached:
+                value = pickle.load(cached)
+            # the modification time orders the files from least to most recently used
+            os.utime(self._path(key))
+            self.disk_hits += count
+            self._remember(key, value)
+            return True, value
+
+        self.misses += count
+        return False, None
+
+    def put(self, key, value):
+        """
+            put will store a value in memory, and on disk when the cache has a directory
+        """
+
+        self._remember(key, value)
+
+        if self.directory is not None:
+            # write to a temporary file first, so a crash never leaves half a result behind
+            path = self._path(key)
+            new = not os.path.exists(path)
+            with open(path + '.tmp', 'wb') as cached:
+                pickle.dump(value, cached)
+            os.replace(path + '.tmp', path)
+            if new:
+                self._count_file()
+
+    def _files(self):
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith('.pickle')]
+
+    def _count_file(self):
+        # beyond disk_maxsize the least recently used files are removed
+        if self.disk_maxsize is None:
+            return
+        if self._disk_size is None:
+            self._disk_size = len(self._files())
+        else:
+            self._disk_size += 1
+
+        if self._disk_size > self.disk_maxsize:
+            files = sorted(self._files(), key=lambda entry: entry.stat().st_mtime_ns)
+            for entry in files[:len(files) - self.disk_maxsize]:
+                os.remove(entry.path)
+            self._disk_size = min(len(files), self.disk_maxsize)
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, preferences=None):
+        """
+            invalidate will drop the cached results and tallies of one profile (or ballots file), or of everything when no 
+            profile is given, from memory and disk
+
+            Parameters:
+                preferences: dictionary, PreferenceProfile, str or path, default=None - the profile to forget
+        """
+
+        if preferences is None:
+            self._entries.clear()
+            if self.directory is not None:
+                for entry in self._files():
+                    os.remove(entry.path)
+                self._disk_size = 0
+            return
+
+        # inputs that cannot be fingerprinted (worksheets) are never cached
+        fingerprint = self._source_fingerprint(preferences)
+        if fingerprint is None:
+            return
+
+        for key in [key for key in self._entries if key[0] == fingerprint]:
+            del self._entries[key]
+
+        if self.directory is not None:
+            prefix = self._prefix(fingerprint)
+            for entry in self._files():
+                if entry.name.startswith(prefix):
+                    os.remove(entry.path)
+            self._disk_size = None
+
+    def call(self, rule, preferences, *args, **kwargs):
+        """
+            call will return rule(preferences, *args, **kwargs), from the cache when the same rule was already called with 
+            the same profile content and arguments. Results that are False (invalid input) are not cached
+
+            Parameters:
+                rule: function - one of the voting functions
+
+                preferences: dictionary, PreferenceProfile, str or path - the first argument of the rule
+
+                *args, **kwargs - the other arguments of the rule
+
+            Return:
+                the rule's result
+        """
+
+        fingerprint, preferences = self._source(preferences)
+        if fingerprint is None:
+            return rule(preferences, *args, **kwargs)
+
+        key = (fingerprint, rule.__name__, _rule_arguments(rule, args, kwargs))
+        found, result = self.get(key)
+        if found:
+            return copy.deepcopy(result)
+
+        # a new PreferenceProfile object with known content gets its tallies back instead of recounting them
+        if isinstance(preferences, PreferenceProfile):
+            cached = self._restore_tallies(fingerprint, preferences)
+
+        result = rule(preferences, *args, **kwargs)
+
+        if isinstance(preferences, PreferenceProfile):
+            self._save_tallies(fingerprint, preferences, cached)
+        if result is not False:
+            self.put(key, result)
+
+        return copy.deepcopy(result)
+
+    def _restore_tallies(self, fingerprint, profile):
+        # returns the cached (position counts, pairwise matrix), with None for the ones not cached yet
+        found, tallies = self.get((fingerprint, 'tallies'), count=False)
+        if not found:
+            return None, None
+
+        position_counts, pairwise = tallies
+        if profile._position_counts is None:
+            profile._position_counts = position_counts
+        if profile._pairwise is None:
+            profile._pairwise = pairwise
+        return tallies
+
+    def _save_tallies(self, fingerprint, profile, cached):
+        # the tallies are only stored again when the rule counted one that was not cached
+        position_counts, pairwise = cached
+        if ((position_counts is None and profile._position_counts is not None)
+                or (pairwise is None and profile._pairwise is not None)):
+            self.put((fingerprint, 'tallies'), (profile._position_counts, profile._pairwise))
+
+    def wrap(self, rule):
+        """
+            wrap will return a version of a voting function that goes through the cache
+
+            Parameters:
+                rule: function - one of the voting functions
+
+            Return:
+                function with the same arguments as rule
+        """
+
+        @wraps(rule)
+        def cached_rule(preferences, *args, **kwargs):
+            return self.call(rule, preferences, *args, **kwargs)
+
+        return cached_rule
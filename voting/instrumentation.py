@@ -0,0 +1,180 @@
+# time, tracemalloc and contextlib/functools are used by the opt-in instrumentation of the stages of a vote
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+
+
+# the following set of functions and classes instrument the stages of a vote (workbook parsing, ranking, counting, STV
+# rounds, tie breaking, ...). Nothing is recorded unless an instrument() block is active, and while it is not, each
+# instrumented call only costs one extra check
+
+# the Instrumentation of the active instrument() block, None when instrumentation is off
+_instrumentation = None
+
+
+class Instrumentation:
+    """
+        Instrumentation collects per-stage timers, counters and (optionally) allocation stats while an instrument() block 
+        is active
+
+        Attributes:
+            stages: dictionary - the stage names as keys and dictionaries with the number of 'calls', the total 'seconds' 
+            and, when allocations are traced, the largest 'peak_bytes' allocated during one call as values
+
+            counters: dictionary - counter names as keys (for example 'STV rounds' or 'STV ballots touched') and their 
+            totals as values
+    """
+
+    def __init__(self, callback=None, allocations=False):
+        """
+            Parameters:
+                callback: function, default=None - called as callback(stage, seconds, peak_bytes) every time a stage 
+                finishes. peak_bytes is None unless allocations are traced
+
+                allocations: bool, default=False - trace memory allocations with tracemalloc (which slows the vote down)
+        """
+
+        self.stages = {}
+        self.counters = {}
+        self.callback = callback
+        self.allocations = allocations
+
+        # one [current bytes at start, highest bytes seen] pair per stage that is running, innermost last
+        self._memory_stack = []
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def _start(self):
+        if self.allocations:
+            current, peak = tracemalloc.get_traced_memory()
+
+            # the peak is reset for the new stage, so remember it for the stage that contains it
+            if self._memory_stack:
+                self._memory_stack[-1][1] = max(self._memory_stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._memory_stack.append([current, current])
+
+        return time.perf_counter()
+
+    def _finish(self, name, start):
+        seconds = time.perf_counter() - start
+
+        peak_bytes = None
+        if self.allocations:
+            frame = self._memory_stack.pop()
+            peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+            peak_bytes = peak - frame[0]
+            if self._memory_stack:
+                self._memory_stack[-1][1] = max(self._memory_stack[-1][1], peak)
+
+        stage = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0})
+        stage['calls'] += 1
+        stage['seconds'] += seconds
+        if peak_bytes is not None:
+            stage['peak_bytes'] = max(stage.get('peak_bytes', 0), peak_bytes)
+
+        if self.callback is not None:
+            self.callback(name, seconds, peak_bytes)
+
+    def report(self):
+        """
+            report will return the stages (slowest first) and counters as a printable table
+
+            Return:
+                report: str
+        """
+
+        lines = [f"{'stage':<28}{'calls':>10}{'seconds':>14}{'peak bytes':>14}"]
+        for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]['seconds']):
+            lines.append(f"{name:<28}{stage['calls']:>10}{stage['seconds']:>14.6f}{stage.get('peak_bytes', ''):>14}")
+        for name, total in self.counters.items():
+            lines.append(f'{name:<28}{total:>10}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def instrument(callback=None, allocations=False):
+    """
+        instrument is a context manager that records the stages of every vote run inside it
+
+        Example:
+            with instrument() as stats:
+                STV(preferences)
+            print(stats.report())
+
+        Parameters:
+            callback: function, default=None - called as callback(stage, seconds, peak_bytes) when each stage finishes
+
+            allocations: bool, default=False - also record each stage's peak memory with tracemalloc
+
+        Return:
+            Instrumentation
+    """
+
+    global _instrumentation
+
+    stats = Instrumentation(callback, allocations)
+    previous = _instrumentation
+    started_tracing = allocations and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    _instrumentation = stats
+    try:
+        yield stats
+    finally:
+        _instrumentation = previous
+        if started_tracing:
+            tracemalloc.stop()
+
+
+def _timed(name):
+    """
+        _timed is a decorator that records each call of a function as the stage name while instrumentation is on
+    """
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            stats = _instrumentation
+            if stats is None:
+                return function(*args, **kwargs)
+
+            start = stats._start()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stats._finish(name, start)
+        return wrapper
+    return decorator
+
+
+def _count(name, amount=1):
+    """
+        _count will add amount to a counter while instrumentation is on
+    """
+
+    if _instrumentation is not None:
+        _instrumentation.count(name, amount)
+
+
+def _timed_chunks(name, chunks):
+    """
+        _timed_chunks will record the time spent producing each chunk of a chunk generator as the stage name, and count 
+        the rows it yields. Used for the ballots loaders, whose work happens between the yields
+    """
+
+    stats = _instrumentation
+    while True:
+        start = stats._start()
+        try:
+            chunk = next(chunks, None)
+        finally:
+            stats._finish(name, start)
+
+        if chunk is None:
+            return
+        stats.count('rows parsed', len(chunk))
+        yield chunk
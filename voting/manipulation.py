@@ -0,0 +1,342 @@
+# the following functions estimate how manipulable a voting rule is on a profile. They sample coalitions of agents, let them
+# misreport their rankings, and check whether the winner changes to one they all prefer. A perturbation only touches the
+# coalition's ballots, so instead of running the rule again the scoring rules add the difference to the cached score
+# totals, and STV replays its cached per-round tallies and only reruns the election when an elimination changes
+import os
+import time
+
+import numpy as np
+
+from .profile import PreferenceProfile, as_profile
+from .tiebreak import TieBreaker
+from .rules import _SCORE_VECTORS, scoreTally, _stv_rounds, _integer_scale
+
+
+# rules that manipulability can analyse. 'scoringRule' uses the scoreVector argument
+_MANIPULATION_RULES = ('plurality', 'veto', 'borda', 'harmonic', 'scoringRule', 'STV')
+
+# largest number of random keys drawn at once to sample a batch of coalitions (8 bytes each)
+_KEYS_LIMIT = 1 << 21
+
+# the analysis each worker process runs, set once by _manipulation_init
+_manipulation_engine = None
+
+
+class _Manipulation:
+    """
+        _Manipulation holds the cached tallies of one profile and rule, and evaluates batches of sampled coalitions
+        against them. Alternatives are referred to by their index into profile.alternatives
+    """
+
+    def __init__(self, profile, rule, coalition_size, tieBreak, scoreVector, strategy):
+        self.rule = rule
+        self.coalition_size = coalition_size
+        self.strategy = strategy
+        self.n_agents = profile.n_agents
+        self.alt_len = profile.n_alternatives
+
+        # a lower key wins a tie, see TieBreaker.keys. The tie breaking agent keeps their sincere ranking
+        self.tie_keys = TieBreaker(tieBreak, profile if isinstance(tieBreak, int) else None).keys(
+            profile.alternatives).astype(np.int64)
+
+        if rule == 'STV':
+            # STV reruns on the compressed profile, where a perturbation only changes a few weights
+            self.profile = profile.compress()
+            final_list, rounds = _stv_rounds(self.profile, trace=True)
+            self.winner = self._break(np.searchsorted(self.profile.alternatives, final_list))
+
+            # for every round: the remaining alternatives, their top-choice tallies and the ones eliminated
+            self.remaining, self.tallies, self.eliminated = [], [], []
+            for stv_round in rounds:
+                remaining = np.zeros(self.alt_len, dtype=bool)
+                tallies = np.zeros(self.alt_len, dtype=np.int64)
+                eliminated = np.zeros(self.alt_len, dtype=bool)
+                index = np.searchsorted(self.profile.alternatives, list(stv_round['tallies']))
+                remaining[index] = True
+                tallies[index] = list(stv_round['tallies'].values())
+                eliminated[np.searchsorted(self.profile.alternatives, stv_round['eliminated'])] = True
+                self.remaining.append(remaining)
+                self.tallies.append(tallies)
+                self.eliminated.append(eliminated)
+
+        else:
+            self.profile = profile
+            if rule == 'scoringRule':
+                if scoreVector is None:
+                    raise ValueError("rule 'scoringRule' needs a scoreVector.")
+                # the scores are sorted the way scoringRule sorts them
+                vector = np.asarray(sorted(scoreVector, reverse=True))
+            else:
+                vector = np.asarray(_SCORE_VECTORS[rule](self.alt_len))
+            if len(vector) != self.alt_len:
+                raise ValueError('scoreVector must have one score per alternative.')
+
+            # fractional scores (like harmonic's 1/j) are scaled to integers so that totals can be compared exactly. Only
+            # scores whose scaled totals would not fit in 64 bits fall back to floats compared with a small tolerance
+            scale = _integer_scale(vector, self.n_agents)
+            if scale is not None:
+                self.vector = np.round(vector * scale).astype(np.int64)
+                self.tolerance = 0
+                self.totals = profile.position_counts() @ self.vector
+            else:
+                self.vector = vector.astype(float)
+                self.tolerance = 1e-9 * max(1.0, float(np.abs(vector).sum()) * self.n_agents)
+                self.totals = np.asarray(scoreTally(profile, vector.tolist()), dtype=float)
+            self.winner = self._winners(self.totals[None, :])[0]
+
+    def _break(self, tied):
+        # break a tie between alternative indices
+        tied = np.asarray(tied)
+        return int(tied[self.tie_keys[tied].argmin()])
+
+    def _winners(self, totals):
+        # the tie broken winner of each row of totals
+        tied = totals >= totals.max(axis=-1, keepdims=True) - self.tolerance
+        return np.where(tied, self.tie_keys, np.iinfo(np.int64).max).argmin(axis=-1)
+
+    def _coalitions(self, rng, size):
+        # sample coalitions of distinct agents. Small coalitions of a large profile rarely pick an agent twice, so those
+        # rows are redrawn. For a small profile every agent gets a random key and the coalition is the agents with the
+        # smallest keys. Otherwise each coalition is drawn on its own without replacement, in memory of its size
+        if 2 * self.coalition_size ** 2 > self.n_agents:
+            if size * self.n_agents > _KEYS_LIMIT:
+                return np.stack([rng.choice(self.n_agents, self.coalition_size, replace=False) for _ in range(size)])
+            keys = rng.random((size, self.n_agents))
+            if self.coalition_size == self.n_agents:
+                return keys.argsort(axis=1)
+            return np.argpartition(keys, self.coalition_size - 1, axis=1)[:, :self.coalition_size]
+
+        # fewer than one row in four has a repeated agent, so this ends after a few rounds
+        coalitions = rng.integers(self.n_agents, size=(size, self.coalition_size))
+        if self.coalition_size > 1:
+            while True:
+                ordered = np.sort(coalitions, axis=1)
+                repeated = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+                if not repeated.any():
+                    break
+                coalitions[repeated] = rng.integers(self.n_agents, size=(int(repeated.sum()), self.coalition_size))
+        return coalitions
+
+    def _misreports(self, rng, positions):
+        """
+            _misreports will yield the positions each coalition reports instead of its sincere ones, with a mask of the
+            coalitions the misreport applies to. 'bury' tries every target the whole coalition prefers to the winner:
+            every member ranks the target first and the winner last. 'random' lets every member report a random ranking
+        """
+
+        if self.strategy == 'random':
+            yield rng.permuted(np.broadcast_to(np.arange(self.alt_len), positions.shape), axis=-1), None
+            return
+
+        winner = positions[..., self.winner:self.winner + 1]
+        for target in range(self.alt_len):
+            if target == self.winner:
+                continue
+            preferred = (positions[..., target] < positions[..., self.winner]).all(axis=1)
+            if not preferred.any():
+                continue
+
+            # moving the target to the top and the winner to the bottom shifts the alternatives in between
+            target_position = positions[..., target:target + 1]
+            reported = 1 + positions - (positions > target_position) - (positions > winner)
+            reported[..., target] = 0
+            reported[..., self.winner] = self.alt_len - 1
+            yield reported, preferred
+
+    def batch(self, rng, size):
+        """
+            batch will sample size coalitions and return how many could make a winner they all prefer win, and how many
+            changed the winner
+        """
+
+        coalitions = self._coalitions(rng, size)
+        rows = coalitions if self.profile.agent_ballots is None else self.profile.agent_ballots[coalitions]
+        positions = self.profile.positions[rows].astype(np.int64)
+
+        manipulable = np.zeros(size, dtype=bool)
+        changed = np.zeros(size, dtype=bool)
+        for reported, applies in self._misreports(rng, positions):
+            winners = self._rescore(rows, positions, reported)
+            moved = winners != self.winner
+            if applies is not None:
+                moved &= applies
+
+            # the new winner must be preferred to the old one by every member of the coalition
+            new_positions = np.take_along_axis(positions, winners[:, None, None], axis=-1)[..., 0]
+            better = (new_positions < positions[..., self.winner]).all(axis=1)
+            manipulable |= moved & better
+            changed |= moved
+
+        return int(manipulable.sum()), int(changed.sum())
+
+    def _rescore(self, rows, positions, reported):
+        if self.rule != 'STV':
+            # swap the coalition's sincere scores for the reported ones
+            totals = (self.totals - self.vector[positions].sum(axis=1) + self.vector[reported].sum(axis=1))
+            return self._winners(totals)
+        return self._stv_rescore(rows, positions, reported)
+
+    def _stv_rescore(self, rows, positions, reported):
+        """
+            _stv_rescore will replay the cached STV rounds with the coalition's ballots swapped. While every round removes
+            the same alternatives as the sincere election, the winner is unchanged. Only the coalitions for which a round
+            differs rerun the whole election
+        """
+
+        size = len(rows)
+        sample = np.repeat(np.arange(size), self.coalition_size)
+        diverged = np.zeros(size, dtype=bool)
+
+        for remaining, tallies, eliminated in zip(self.remaining, self.tallies, self.eliminated):
+            # the top remaining alternative of every sincere and reported ballot
+            sincere_tops = np.where(remaining, positions, self.alt_len).argmin(axis=-1).ravel()
+            reported_tops = np.where(remaining, reported, self.alt_len).argmin(axis=-1).ravel()
+
+            round_tallies = np.broadcast_to(tallies, (size, self.alt_len)).copy()
+            np.subtract.at(round_tallies, (sample, sincere_tops), 1)
+            np.add.at(round_tallies, (sample, reported_tops), 1)
+
+            round_tallies[:, ~remaining] = np.iinfo(np.int64).max
+            removed = round_tallies == round_tallies.min(axis=1, keepdims=True)
+            diverged |= (removed != eliminated).any(axis=1)
+
+        winners = np.full(size, self.winner)
+        for i in np.flatnonzero(diverged):
+            winners[i] = self._stv_rerun(rows[i], reported[i])
+        return winners
+
+    def _stv_rerun(self, rows, reported):
+        # the coalition's ballots lose one agent each and their reported ballots are added with one agent each
+        weights = self.profile.weights.copy()
+        np.subtract.at(weights, rows, 1)
+        weights = np.concatenate([weights, np.ones(len(reported), dtype=np.int64)])
+        reported = reported.astype(self.profile.positions.dtype)
+        positions = np.concatenate([self.profile.positions, reported])
+        rankings = np.concatenate([self.profile.rankings, np.argsort(reported, axis=-1).astype(reported.dtype)])
+
+        kept = weights > 0
+        profile = PreferenceProfile(rankings[kept], alternatives=self.profile.alternatives, positions=positions[kept],
+                                    weights=weights[kept])
+        final_list, _ = _stv_rounds(profile)
+        return self._break(np.searchsorted(self.profile.alternatives, final_list))
+
+
+def _manipulation_run(engine, seed, samples, deadline, batch_size):
+    # evaluate batches until samples coalitions were drawn or the deadline passed
+    rng = np.random.default_rng(seed)
+    drawn = manipulable = changed = 0
+    while (samples is None or drawn < samples) and (deadline is None or time.time() < deadline):
+        size = batch_size if samples is None else min(batch_size, samples - drawn)
+        batch_manipulable, batch_changed = engine.batch(rng, size)
+        drawn += size
+        manipulable += batch_manipulable
+        changed += batch_changed
+    return drawn, manipulable, changed
+
+
+def _manipulation_init(engine):
+    global _manipulation_engine
+    _manipulation_engine = engine
+
+
+def _manipulation_worker(seed, samples, deadline, batch_size):
+    return _manipulation_run(_manipulation_engine, seed, samples, deadline, batch_size)
+
+
+def _wilson_interval(successes, trials, confidence):
+    """
+        _wilson_interval will return the Wilson score interval of a proportion, which stays inside [0, 1] and behaves well
+        for rates close to 0 or 1
+    """
+
+    if trials == 0:
+        return (0.0, 1.0)
+
+    from math import sqrt
+    from statistics import NormalDist
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    rate = successes / trials
+    center = (rate + z * z / (2 * trials)) / (1 + z * z / trials)
+    half_width = z * sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials)) / (1 + z * z / trials)
+    return (0.0 if successes == 0 else center - half_width, 1.0 if successes == trials else center + half_width)
+
+
+def manipulability(preferences, rule='plurality', coalition_size=1, tieBreak='max', scoreVector=None, strategy='bury',
+                   samples=10000, time_budget=None, confidence=0.95, processes=1, batch_size=256, seed=0):
+    """
+        manipulability will estimate how often a random coalition of agents can change the winner of a voting rule to an
+        alternative they all prefer, by misreporting their rankings. Coalitions are sampled until samples were drawn or
+        time_budget seconds have passed, whichever comes first
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the agents' ordered alternatives
+
+            rule: str, default='plurality' - 'plurality', 'veto', 'borda', 'harmonic', 'scoringRule' or 'STV'
+
+            coalition_size: int, default=1 - number of agents that misreport together
+
+            tieBreak: str or int, default='max' - the tie break type to use if neccessary. A tie breaking agent's sincere
+            ranking is used even when they are in the coalition
+
+            scoreVector: list, default=None - the scores for 'scoringRule', see scoringRule
+
+            strategy: str, default='bury' - 'bury' tries every alternative the coalition prefers to the winner: each member
+            ranks it first and the winner last. 'random' lets each member report a random ranking, which measures how
+            robust the winner is to noise
+
+            samples: int, default=10000 - number of coalitions to sample. None samples until time_budget runs out
+
+            time_budget: float, default=None - maximum number of seconds to sample for
+
+            confidence: float, default=0.95 - confidence level of the intervals
+
+            processes: int, default=1 - number of worker processes. None uses every core
+
+            batch_size: int, default=256 - number of coalitions evaluated at a time
+
+            seed: int, default=0 - seed of the random generator
+
+        Return:
+            results: dictionary - the number of 'samples', how many were 'manipulable' (the winner changed to one the
+            whole coalition prefers) and how many 'changed' the winner at all, the 'rate' and 'change_rate' with their
+            confidence 'interval' and 'change_interval', and the 'seconds' taken
+    """
+
+    if rule not in _MANIPULATION_RULES:
+        raise ValueError(f'rule must be one of {", ".join(_MANIPULATION_RULES)}.')
+    if strategy not in ('bury', 'random'):
+        raise ValueError("strategy must be 'bury' or 'random'.")
+    if samples is None and time_budget is None:
+        raise ValueError('Give a number of samples, a time budget or both.')
+
+    start = time.time()
+    profile = as_profile(preferences)
+    if not 1 <= coalition_size <= profile.n_agents:
+        raise ValueError('coalition_size must be between 1 and the number of agents.')
+
+    engine = _Manipulation(profile, rule, coalition_size, tieBreak, scoreVector, strategy)
+    deadline = None if time_budget is None else start + time_budget
+
+    processes = processes or os.cpu_count() or 1
+    seeds = np.random.SeedSequence(seed).spawn(processes)
+    if processes == 1:
+        drawn, manipulable, changed = _manipulation_run(engine, seeds[0], samples, deadline, batch_size)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        # the samples are split evenly, and every worker stops at the same deadline
+        shares = [None] * processes if samples is None else \
+            [samples // processes + (i < samples % processes) for i in range(processes)]
+        with ProcessPoolExecutor(processes, initializer=_manipulation_init, initargs=(engine,)) as pool:
+            counts = list(pool.map(_manipulation_worker, seeds, shares, [deadline] * processes,
+                                   [batch_size] * processes))
+        drawn, manipulable, changed = (sum(column) for column in zip(*counts))
+
+    return {'rule': rule, 'coalition_size': coalition_size, 'strategy': strategy, 'samples': drawn,
+            'manipulable': manipulable, 'changed': changed,
+            'rate': manipulable / drawn if drawn else 0.0,
+            'interval': _wilson_interval(manipulable, drawn, confidence),
+            'change_rate': changed / drawn if drawn else 0.0,
+            'change_interval': _wilson_interval(changed, drawn, confidence),
+            'confidence': confidence, 'seconds': time.time() - start}
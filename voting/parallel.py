@@ -0,0 +1,230 @@
+# the sweep functions spread rule evaluations over a process pool, sharing the rankings through shared memory. The
+# process pool and shared memory modules are only imported when a sweep runs in parallel
+import os
+
+import numpy as np
+
+from .profile import PreferenceProfile, as_profile
+from .tiebreak import TieBreaker
+from .rules import _SCORE_VECTORS, scoreTally, _stv_rounds
+
+
+# rules that can be swept, keyed by name. rangeVoting is left out because it needs the preference scores, and dictatorship
+# because it does not use a tie break
+_SWEEP_RULES = ('plurality', 'veto', 'borda', 'harmonic', 'STV', 'scoringRule')
+
+# the profile each sweep worker process reads from shared memory, set once by _sweep_init
+_sweep_profile = None
+_sweep_memory = None
+
+
+def _sweep_candidates(profile, rule, scoreVector):
+    """
+        _sweep_candidates will return the alternatives a rule can pick before tie breaking, so that the tally (or the STV 
+        rounds) only runs once for all the tie breaks of a sweep
+
+        Parameters:
+            profile: PreferenceProfile - the agents' ordered alternatives
+
+            rule: str - one of _SWEEP_RULES
+
+            scoreVector: list - the scores for 'scoringRule', see scoringRule
+
+        Return:
+            max_list: list - the alternative(s) to break the tie between, or False for incorrect input
+    """
+
+    if rule == 'STV':
+        return _stv_rounds(profile)[0]
+
+    if rule == 'scoringRule':
+        if len(scoreVector) != profile.n_alternatives:
+            print('Incorrect input')
+            return False
+        scoreVector = sorted(scoreVector, reverse=True)
+    else:
+        scoreVector = _SCORE_VECTORS[rule](profile.n_alternatives)
+
+    totals = scoreTally(profile, scoreVector)
+    return profile.alternatives[totals == totals.max()].tolist()
+
+
+def _sweep_task(profile, rule, scoreVector, tieBreaks):
+    """
+        _sweep_task will compute the winner of one rule (and score vector) under each of the given tie breaks
+
+        Parameters:
+            tieBreaks: list - the tie breaks validated by sweep: 'max', 'min', a TieBreaker, the row of a tie breaking 
+            agent in the profile, or None for a tie break that is not valid
+
+        Return:
+            winners: list - the winning alternative for each tie break, False for the ones that are not valid
+    """
+
+    max_list = _sweep_candidates(profile, rule, scoreVector)
+    if max_list is False:
+        return [False] * len(tieBreaks)
+
+    # a single candidate needs no tie break at all
+    if len(max_list) == 1:
+        return [False if tieBreak is None else max_list[0] for tieBreak in tieBreaks]
+
+    winners = []
+    for tieBreak in tieBreaks:
+        if tieBreak is None:
+            winners.append(False)
+        elif tieBreak == 'max':
+            winners.append(max(max_list))
+        elif tieBreak == 'min':
+            winners.append(min(max_list))
+        elif isinstance(tieBreak, TieBreaker):
+            winners.append(tieBreak(max_list))
+        else:
+            winners.append(None)
+
+    # the agents' ties are broken together, by the candidate each of them ranks highest
+    agents = [i for i, winner in enumerate(winners) if winner is None]
+    if agents:
+        candidates = np.searchsorted(profile.alternatives, max_list)
+        rows = np.array([tieBreaks[i] for i in agents])
+        best = np.asarray(max_list)[profile.positions[np.ix_(rows, candidates)].argmin(axis=1)].tolist()
+        for i, winner in zip(agents, best):
+            winners[i] = winner
+
+    return winners
+
+
+def _sweep_init(memory_name, shape, dtype, agents, alternatives, weights, agent_ballots, position_counts):
+    """
+        _sweep_init runs once in every sweep worker process. It attaches to the shared memory block holding the rankings 
+        and positions and wraps it in a PreferenceProfile without copying it
+    """
+
+    global _sweep_profile, _sweep_memory
+
+    from multiprocessing import shared_memory
+
+    try:
+        # the parent process owns the block, so the worker must not register it for cleanup (Python 3.13+)
+        _sweep_memory = shared_memory.SharedMemory(name=memory_name, track=False)
+    except TypeError:
+        _sweep_memory = shared_memory.SharedMemory(name=memory_name)
+
+    arrays = np.ndarray((2,) + tuple(shape), dtype=dtype, buffer=_sweep_memory.buf)
+    _sweep_profile = PreferenceProfile(arrays[0], agents, alternatives, positions=arrays[1], weights=weights,
+                                       agent_ballots=agent_ballots)
+    _sweep_profile._position_counts = position_counts
+
+
+def _sweep_worker(rule, scoreVector, tieBreaks):
+    return _sweep_task(_sweep_profile, rule, scoreVector, tieBreaks)
+
+
+def sweep(preferences, rules=('plurality', 'veto', 'borda', 'harmonic', 'STV'), tieBreaks=None, scoreVectors=(),
+          processes=None, batch_size=None):
+    """
+        sweep will compute the winner of every rule under every tie break (and of scoringRule under every score vector) to 
+        audit how sensitive the outcome is. The evaluations are spread over a pool of worker processes that read the 
+        preference matrix from shared memory instead of receiving a pickled copy per task, and each rule is only tallied 
+        once per batch of tie breaks
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the agents' ordered alternatives
+
+            rules: list, default=('plurality', 'veto', 'borda', 'harmonic', 'STV') - names of the voting functions to sweep.
+            'scoringRule' is added automatically when scoreVectors are given
+
+            tieBreaks: list, default=None - the tie breaks to sweep ('max', 'min' or agent numbers). None sweeps every agent 
+            of the profile. A tie break that is not valid gets False as its winner
+
+            scoreVectors: list of lists, default=() - score vectors for scoringRule
+
+            processes: int, default=None - number of worker processes. None uses every CPU core, 1 runs in this process
+
+            batch_size: int, default=None - number of tie breaks handled by each task. None splits them evenly over the 
+            worker processes
+
+        Return:
+            table: list - one dictionary per evaluation with the 'rule', 'scoreVector' (None except for scoringRule), 
+            'tieBreak' and 'winner', in the order of rules, score vectors and tie breaks
+    """
+
+    profile = as_profile(preferences)
+    if tieBreaks is None:
+        # every agent is a valid tie break, and the i-th agent is in row i (of the rankings, or of agent_ballots)
+        tieBreaks = list(profile)
+        validated = list(range(profile.n_agents)) if profile.agent_ballots is None else profile.agent_ballots.tolist()
+    else:
+        tieBreaks = list(tieBreaks)
+        validated = None
+
+    rules = list(rules)
+    if scoreVectors and 'scoringRule' not in rules:
+        rules.append('scoringRule')
+
+    for rule in rules:
+        if rule not in _SWEEP_RULES:
+            raise ValueError(f'Rule {rule!r} cannot be swept.')
+
+    # every tie break is validated once, the way TieBreaker validates it, and an agent is replaced by its row
+    if validated is None:
+        validated = []
+        for tieBreak in tieBreaks:
+            if isinstance(tieBreak, TieBreaker):
+                validated.append(tieBreak)
+            elif isinstance(tieBreak, int):
+                try:
+                    validated.append(profile.row(tieBreak))
+                except KeyError:
+                    print('Tiebreaking agent number out of bounds.')
+                    validated.append(None)
+            elif isinstance(tieBreak, str) and tieBreak.lower() in ('max', 'min'):
+                validated.append(tieBreak.lower())
+            else:
+                print('tieBreak string not recognized.')
+                validated.append(None)
+
+    # one job per rule, or per score vector for scoringRule
+    jobs = [(rule, scoreVector) for rule in rules
+            for scoreVector in ([list(vector) for vector in scoreVectors] if rule == 'scoringRule' else [None])]
+
+    processes = processes or os.cpu_count() or 1
+    if batch_size is None:
+        batch_size = max(1, -(-len(tieBreaks) // processes))
+    starts = range(0, len(tieBreaks), batch_size)
+    batches = [validated[start:start + batch_size] for start in starts]
+
+    if processes == 1:
+        winners = [_sweep_task(profile, rule, scoreVector, batch) for rule, scoreVector in jobs for batch in batches]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import shared_memory
+
+        # copy the rankings and positions into one shared memory block that every worker maps
+        shape, dtype = profile.rankings.shape, profile.rankings.dtype
+        memory = shared_memory.SharedMemory(create=True, size=max(1, 2 * profile.rankings.nbytes))
+        try:
+            arrays = np.ndarray((2,) + shape, dtype=dtype, buffer=memory.buf)
+            arrays[0] = profile.rankings
+            arrays[1] = profile.positions
+
+            initargs = (memory.name, shape, dtype, profile.agents, profile.alternatives, profile.weights,
+                        profile.agent_ballots, profile.position_counts())
+            with ProcessPoolExecutor(processes, initializer=_sweep_init, initargs=initargs) as pool:
+                futures = [pool.submit(_sweep_worker, rule, scoreVector, batch)
+                           for rule, scoreVector in jobs for batch in batches]
+                winners = [future.result() for future in futures]
+            del arrays
+        finally:
+            memory.close()
+            memory.unlink()
+
+    # flatten the batches back into one row per evaluation
+    table = []
+    results = iter(winners)
+    for rule, scoreVector in jobs:
+        for start in starts:
+            for tieBreak, winner in zip(tieBreaks[start:start + batch_size], next(results)):
+                table.append({'rule': rule, 'scoreVector': scoreVector, 'tieBreak': tieBreak, 'winner': winner})
+
+    return table
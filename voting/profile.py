@@ -0,0 +1,460 @@
+# Mapping lets PreferenceProfile behave like the dictionary returned by generatePreferences
+from collections.abc import Mapping
+
+# numpy holds the rankings of a PreferenceProfile as compact, contiguous integer arrays
+import numpy as np
+
+from .instrumentation import _timed, _count
+from .ballots import iterRankChunks, rankScores, _rank_dtype
+
+
+@_timed('count positions')
+def _count_positions(rankings, alt_len, weights=None):
+    """
+        _count_positions will count how many agents in rankings put each alternative at each position, using one scatter-add
+
+        Parameters:
+            rankings: numpy array of shape (agents, alternatives) - ranked alternative indices, most preferred first
+
+            alt_len: int - number of alternatives
+
+            weights: numpy array, default=None - number of agents that cast each ranking. None counts every ranking once
+
+        Return:
+            counts: numpy array of shape (alternatives, alternatives) - entry [alt, pos] is the number of agents that rank
+            alt at pos (0 = top)
+    """
+
+    _count('ballots counted', len(rankings))
+
+    # alternative alt at position pos is scattered into flat bin alt * alt_len + pos
+    bins = rankings.astype(np.intp) * alt_len + np.arange(alt_len, dtype=np.intp)
+    if weights is not None:
+        weights = np.repeat(weights, alt_len)
+    return _bincount(bins.ravel(), weights, alt_len * alt_len).reshape(alt_len, alt_len)
+
+
+def _bincount(values, weights, minlength):
+    """
+        _bincount will count the occurrences of each value, each one counting weights[i] times when weights are given. The 
+        counts are always integers, unlike np.bincount with weights which returns floats
+
+        Parameters:
+            values: numpy array - non-negative integers to count
+
+            weights: numpy array or None - integer weight of each value
+
+            minlength: int - minimum number of bins
+
+        Return:
+            counts: numpy array of int64
+    """
+
+    if weights is None:
+        return np.bincount(values, minlength=minlength)
+    return np.bincount(values, weights=weights, minlength=minlength).astype(np.int64)
+
+
+class PreferenceProfile(Mapping):
+    """
+        PreferenceProfile stores every agent's ranked preferences as a contiguous integer array instead of a dictionary of
+        lists. It behaves like the dictionary returned by generatePreferences (profile[agent] gives the agent's ordered
+        alternatives, 'agent in profile' checks the agent exists, etc.), so it can be passed to any of the voting functions.
+
+        A profile can also be compressed (see compress and the compress arguments of the constructors), in which case 
+        rankings only holds each distinct ranking once together with the number of agents that cast it. The voting 
+        functions then do work proportional to the number of distinct rankings rather than the number of agents.
+
+        Attributes:
+            agents: numpy array - the agent numbers
+
+            alternatives: numpy array - the alternative numbers, sorted ascending. The rankings and positions matrices refer
+            to alternatives by their index in this array
+
+            rankings: numpy array of shape (ballots, alternatives) - row i holds the indices of the alternatives of ballot 
+            i, from most preferred to least preferred. Without compression there is one ballot per agent, in agent order
+
+            positions: numpy array of shape (ballots, alternatives) - positions[i, j] is the rank (0 = top) that ballot i 
+            gives to alternative j. This is the inverse of rankings and is precomputed once
+
+            weights: numpy array - number of agents that cast each ballot, None when every ballot is a single agent
+
+            agent_ballots: numpy array - the ballot (row of rankings) of each agent, None when ballot i is agent i
+    """
+
+    def __init__(self, rankings, agents=None, alternatives=None, positions=None, weights=None, agent_ballots=None):
+        """
+            Parameters:
+                rankings: array-like of shape (agents, alternatives) - each row is an agent's ranking given as indices
+                into alternatives, most preferred first
+
+                agents: array-like, default=None - the agent numbers for each row. Defaults to 1, 2, ..., number of agents
+
+                alternatives: array-like, default=None - the sorted alternative numbers. Defaults to 1, 2, ..., number of
+                alternatives
+
+                positions: array-like, default=None - the already inverted rankings (see the positions attribute), for 
+                example when the arrays live in shared memory. Computed from rankings when not given
+
+                weights: array-like, default=None - number of agents that cast each ranking, for a compressed profile
+
+                agent_ballots: array-like, default=None - the row of rankings that each agent cast, for a compressed
+                profile. agents then defaults to 1, 2, ..., len(agent_ballots)
+        """
+
+        rankings = np.asarray(rankings)
+        if rankings.ndim != 2:
+            raise ValueError('rankings must be a 2-dimensional array of shape (agents, alternatives).')
+
+        ballot_len, alt_len = rankings.shape
+        dtype = _rank_dtype(alt_len)
+
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.int64)
+        self.agent_ballots = None if agent_ballots is None else np.asarray(agent_ballots)
+        agent_len = ballot_len if self.agent_ballots is None else len(self.agent_ballots)
+
+        self.rankings = np.ascontiguousarray(rankings, dtype=dtype)
+        self.agents = np.arange(1, agent_len + 1) if agents is None else np.asarray(agents)
+        self.alternatives = np.arange(1, alt_len + 1) if alternatives is None else np.asarray(alternatives)
+
+        if len(self.agents) != agent_len or len(self.alternatives) != alt_len:
+            raise ValueError('agents and alternatives must match the shape of rankings.')
+
+        if self.weights is not None and len(self.weights) != ballot_len:
+            raise ValueError('weights must have one entry per ranking.')
+
+        # invert each ranking so that positions[i, alt] gives the rank of alt for agent i
+        if positions is not None:
+            self.positions = np.ascontiguousarray(positions, dtype=dtype)
+        else:
+            self.positions = np.empty_like(self.rankings)
+            np.put_along_axis(self.positions, self.rankings.astype(np.intp),
+                              np.broadcast_to(np.arange(alt_len, dtype=dtype), self.rankings.shape), axis=1)
+
+        # the position count matrix is built the first time a scoring rule needs it and reused afterwards, and the 
+        # pairwise majority matrix the first time a pairwise rule needs it
+        self._position_counts = None
+        self._pairwise = None
+        self._fingerprint = None
+
+        # when the agents are numbered consecutively (as generatePreferences numbers them) an agent's row can be found
+        # by subtraction, otherwise fall back to a lookup dictionary
+        if agent_len and np.array_equal(self.agents, np.arange(self.agents[0], self.agents[0] + agent_len)):
+            self._agent_start = int(self.agents[0])
+            self._agent_rows = None
+        else:
+            self._agent_start = None
+            self._agent_rows = {int(agent): row for row, agent in enumerate(self.agents)}
+
+    @classmethod
+    def from_dict(cls, pref_dict, compress=False):
+        """
+            from_dict will build a PreferenceProfile from the dictionary returned by generatePreferences
+
+            Parameters:
+                pref_dict: dictionary - the preference dictionary that has the agents as keys and their ordered alternatives
+                as values. Output of generatePreferences function
+
+                compress: bool, default=False - store each distinct ranking once with its number of agents
+
+            Return:
+                PreferenceProfile
+        """
+
+        ranked = np.array(list(pref_dict.values()))
+        if ranked.ndim != 2:
+            raise ValueError('Every agent must rank the same number of alternatives.')
+
+        # alternatives are stored by their index in the sorted alternative numbers
+        alternatives = np.sort(ranked[0]) if len(ranked) else np.array([], dtype=int)
+        return cls.from_chunks([np.searchsorted(alternatives, ranked)], compress, agents=list(pref_dict.keys()),
+                               alternatives=alternatives)
+
+    @classmethod
+    def from_scores(cls, scores):
+        """
+            from_scores will build a PreferenceProfile from a matrix of preference scores, ranking the alternatives the same
+            way generatePreferences does (highest score first, ties go to the higher alternative number)
+
+            Parameters:
+                scores: array-like of shape (agents, alternatives) - each agent's preference score for each alternative
+
+            Return:
+                PreferenceProfile
+        """
+
+        return cls(rankScores(scores))
+
+    @classmethod
+    @_timed('build profile')
+    def from_chunks(cls, chunks, compress=False, agents=None, alternatives=None):
+        """
+            from_chunks will build a PreferenceProfile from chunks of rankings, such as the ones yielded by iterRankChunks.
+            With compress=True the rankings of each chunk are hashed as they arrive, and only the distinct rankings are kept
+            along with how many agents cast each one
+
+            Parameters:
+                chunks: iterable of numpy arrays of shape (agents, alternatives) - ranked alternative indices
+
+                compress: bool, default=False - store each distinct ranking once with its number of agents
+
+                agents: array-like, default=None - the agent numbers. Defaults to 1, 2, ..., number of agents
+
+                alternatives: array-like, default=None - the sorted alternative numbers
+
+            Return:
+                PreferenceProfile
+        """
+
+        if not compress:
+            return cls(np.concatenate(list(chunks)), agents, alternatives)
+
+        # ballot number of each distinct ranking seen so far, keyed by the ranking's bytes
+        ballot_ids = {}
+        unique_rankings = []
+        weights = []
+        agent_ballots = []
+
+        for chunk in chunks:
+            chunk = np.ascontiguousarray(chunk, dtype=_rank_dtype(chunk.shape[1]))
+
+            # group the chunk's identical rankings first, so each distinct ranking is only hashed once per chunk. Viewing
+            # each row as a single block of bytes is much faster than np.unique(axis=0)
+            rows = chunk.view(np.dtype((np.void, chunk.itemsize * chunk.shape[1]))).ravel()
+            rankings, first, inverse, counts = np.unique(rows, return_index=True, return_inverse=True, return_counts=True)
+
+            chunk_ids = np.empty(len(rankings), dtype=np.int64)
+            for i, (ranking, count) in enumerate(zip(rankings, counts.tolist())):
+                key = ranking.tobytes()
+                if key not in ballot_ids:
+                    ballot_ids[key] = len(unique_rankings)
+                    unique_rankings.append(chunk[first[i]])
+                    weights.append(0)
+                chunk_ids[i] = ballot_ids[key]
+                weights[chunk_ids[i]] += count
+
+            agent_ballots.append(chunk_ids[inverse.ravel()])
+
+        return cls(np.array(unique_rankings), agents, alternatives, weights=weights,
+                   agent_ballots=np.concatenate(agent_ballots))
+
+    @classmethod
+    def from_worksheet(cls, values, chunk_size=10000, compress=False):
+        """
+            from_worksheet will build a PreferenceProfile directly from an openpyxl worksheet or any ballots file supported
+            by iterScoreChunks, streaming the rows in chunks instead of going through the dictionary returned by 
+            generatePreferences
+
+            Parameters:
+                values: str, path, openpyxl worksheet or numpy array - the ballots file or worksheet, where the columns are 
+                the alternatives and the rows are the agents. Each cell contains that agent's preference score for the 
+                corrsponding alternative
+
+                chunk_size: int, default=10000 - number of rows read at a time
+
+                compress: bool, default=False - store each distinct ranking once with its number of agents, see from_chunks
+
+            Return:
+                PreferenceProfile
+        """
+
+        return cls.from_chunks(iterRankChunks(values, chunk_size), compress)
+
+    def compress(self):
+        """
+            compress will return the same profile with each distinct ranking stored once, weighted by its number of agents
+
+            Return:
+                PreferenceProfile
+        """
+
+        if self.weights is not None:
+            return self
+        return PreferenceProfile.from_chunks([self.rankings], True, self.agents, self.alternatives)
+
+    def agent_rankings(self):
+        """
+            agent_rankings will return one row of ranked alternative indices per agent, in agent order, expanding a 
+            compressed profile
+
+            Return:
+                rankings: numpy array of shape (agents, alternatives)
+        """
+
+        return self.rankings if self.agent_ballots is None else self.rankings[self.agent_ballots]
+
+    @property
+    def n_agents(self):
+        return len(self.agents)
+
+    @property
+    def n_ballots(self):
+        return self.rankings.shape[0]
+
+    @property
+    def n_alternatives(self):
+        return self.rankings.shape[1]
+
+    def row(self, agent):
+        """
+            row will return the row of rankings/positions that belongs to an agent
+
+            Parameters:
+                agent: int - the agent number
+
+            Return:
+                row index: int, raises KeyError if the agent does not exist
+        """
+
+        if self._agent_rows is not None:
+            agent_row = self._agent_rows[agent]
+        elif isinstance(agent, (int, np.integer)) and 0 <= agent - self._agent_start < self.n_agents:
+            agent_row = int(agent - self._agent_start)
+        else:
+            raise KeyError(agent)
+
+        return agent_row if self.agent_ballots is None else int(self.agent_ballots[agent_row])
+
+    def position_counts(self, chunk_size=65536):
+        """
+            position_counts will return a matrix where entry [alt, pos] is the number of agents that rank alternative alt 
+            (an index into alternatives) at position pos (0 = top). Every positional scoring rule only needs this matrix, so 
+            it is computed once with a single scatter-add over the rankings and cached on the profile
+
+            Parameters:
+                chunk_size: int, default=65536 - number of agents to process at a time, which bounds the temporary memory
+
+            Return:
+                counts: numpy array of shape (alternatives, alternatives)
+        """
+
+        if self._position_counts is None:
+            alt_len = self.n_alternatives
+            counts = np.zeros((alt_len, alt_len), dtype=np.int64)
+
+            for start in range(0, self.n_ballots, chunk_size):
+                weights = None if self.weights is None else self.weights[start:start + chunk_size]
+                counts += _count_positions(self.rankings[start:start + chunk_size], alt_len, weights)
+
+            self._position_counts = counts
+
+        return self._position_counts
+
+    def fingerprint(self, chunk_size=65536):
+        """
+            fingerprint will return a hash of the profile's content: the agents, the alternatives and every agent's 
+            ranking. Profiles with the same content have the same fingerprint, whether they are compressed or not, so it 
+            can be used to recognise a profile that was already voted on. It is computed once and cached on the profile
+
+            Parameters:
+                chunk_size: int, default=65536 - number of agents hashed at a time
+
+            Return:
+                fingerprint: str - hexadecimal digest
+        """
+
+        if self._fingerprint is None:
+            import hashlib
+
+            digest = hashlib.blake2b(digest_size=20)
+            digest.update(np.asarray(self.agents, dtype=np.int64).tobytes())
+            digest.update(np.asarray(self.alternatives, dtype=np.int64).tobytes())
+
+            # hash one ranking per agent in agent order, expanding a compressed profile a chunk at a time
+            for start in range(0, self.n_agents, chunk_size):
+                if self.agent_ballots is None:
+                    rankings = self.rankings[start:start + chunk_size]
+                else:
+                    rankings = self.rankings[self.agent_ballots[start:start + chunk_size]]
+                digest.update(np.ascontiguousarray(rankings).tobytes())
+
+            self._fingerprint = digest.hexdigest()
+
+        return self._fingerprint
+
+    @_timed('pairwise matrix')
+    def pairwise_matrix(self, max_cells=2 ** 22):
+        """
+            pairwise_matrix will return a matrix where entry [a, b] is the number of agents that rank alternative a above
+            alternative b (both indices into alternatives). It is computed from the positions matrix in vectorized chunks 
+            of agents and cached on the profile, so every pairwise rule shares one build
+
+            Parameters:
+                max_cells: int, default=2**22 - upper bound on the agents x alternatives x alternatives comparisons made
+                at a time, which bounds the temporary memory
+
+            Return:
+                pairwise: numpy array of shape (alternatives, alternatives)
+        """
+
+        if self._pairwise is None:
+            alt_len = self.n_alternatives
+            pairwise = np.zeros((alt_len, alt_len), dtype=np.int64)
+            chunk_size = max(1, max_cells // max(1, alt_len * alt_len))
+
+            for start in range(0, self.n_ballots, chunk_size):
+                positions = self.positions[start:start + chunk_size]
+
+                # beats[i, a, b] is True when ballot i ranks a above b
+                beats = positions[:, :, np.newaxis] < positions[:, np.newaxis, :]
+                if self.weights is None:
+                    pairwise += beats.sum(axis=0)
+                else:
+                    pairwise += (self.weights[start:start + chunk_size] @ beats.reshape(len(positions), -1)).reshape(
+                        alt_len, alt_len)
+
+            self._pairwise = pairwise
+
+        return self._pairwise
+
+    def to_dict(self):
+        """
+            to_dict will convert the profile back into the dictionary format returned by generatePreferences
+
+            Return:
+                pref_dict: dictionary
+        """
+
+        return {int(agent): self.alternatives[ranking].tolist() for agent, ranking in zip(self.agents, self.agent_rankings())}
+
+    def __getitem__(self, agent):
+        return self.alternatives[self.rankings[self.row(agent)]].tolist()
+
+    def __contains__(self, agent):
+        try:
+            self.row(agent)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def __iter__(self):
+        return (int(agent) for agent in self.agents)
+
+    def __len__(self):
+        return self.n_agents
+
+    def __repr__(self):
+        if self.weights is not None:
+            return (f'PreferenceProfile({self.n_agents} agents, {self.n_alternatives} alternatives, '
+                    f'{self.n_ballots} distinct rankings)')
+        return f'PreferenceProfile({self.n_agents} agents, {self.n_alternatives} alternatives)'
+
+
+@_timed('as_profile')
+def as_profile(preferences):
+    """
+        as_profile will return preferences as a PreferenceProfile, converting the dictionary from generatePreferences if needed.
+        Used at the start of the voting functions so that they accept either format. Converting a dictionary copies every
+        ranking, so when several rules (or the same rule several times) run on one dictionary, convert it once with 
+        as_profile and pass the PreferenceProfile instead
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the agents' ordered alternatives
+
+        Return:
+            PreferenceProfile
+    """
+
+    if isinstance(preferences, PreferenceProfile):
+        return preferences
+    return PreferenceProfile.from_dict(preferences)
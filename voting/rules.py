@@ -0,0 +1,562 @@
+import numpy as np
+
+from .instrumentation import _timed, _count
+from .profile import as_profile, _bincount
+from .tiebreak import _rule_result, tie_breaker
+
+
+# score vectors of the positional scoring rules, keyed by rule name. Each one takes the number of alternatives and returns
+# the score given to each rank position, top rank first
+_SCORE_VECTORS = {
+    # one point for the top ranked alternative of each agent, nothing for the rest
+    'plurality': lambda alt_len: [1] + [0] * (alt_len - 1),
+
+    # one point for every alternative except each agent's last ranked one
+    'veto': lambda alt_len: [1] * (alt_len - 1) + [0],
+
+    # the alternative at position j (0 = top) scores alt_len - 1 - j
+    'borda': lambda alt_len: list(range(alt_len - 1, -1, -1)),
+
+    # the alternative at position j (1 = top) scores 1/j
+    'harmonic': lambda alt_len: [1 / j for j in range(1, alt_len + 1)],
+}
+
+
+def _integer_scale(vector, n_agents):
+    """
+        _integer_scale will return the smallest factor that turns every score into an integer (scores are read as fractions
+        with denominators up to 10**6), or None when the scaled totals of n_agents could overflow 64-bit integers
+    """
+
+    from fractions import Fraction
+    from math import lcm
+
+    fractions = [Fraction(float(score)).limit_denominator(10 ** 6) for score in vector]
+    if any(abs(float(fraction) - float(score)) > 1e-12 * max(1.0, abs(float(score)))
+           for fraction, score in zip(fractions, vector)):
+        return None
+
+    scale = lcm(*(fraction.denominator for fraction in fractions))
+    largest = max(abs(fraction) for fraction in fractions) * scale * n_agents * 2
+    return scale if largest < 2 ** 62 else None
+
+
+@_timed('scoreTally')
+def scoreTally(preferences, scoreVector):
+    """
+        scoreTally is the scoring engine behind every positional scoring rule (scoringRule, plurality, veto, borda and harmonic).
+        It computes the total score of every alternative in one vectorized pass, where the alternative each agent ranks at 
+        position j receives scoreVector[j]
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the agents' ordered alternatives
+
+            scoreVector: list - the score given to each rank position, top rank first. Must have one score per alternative
+        
+        Return:
+            totals: numpy array - total score for each alternative, indexed the same as profile.alternatives
+    """
+
+    profile = as_profile(preferences)
+
+    # entry [alt, pos] of position_counts is how many agents put alt at pos, so multiplying by the score of each position 
+    # gives every alternative's total. A float dot product can round two equal totals differently, so fractional scores 
+    # (like harmonic's 1/j) are summed as scaled integers and divided once, which keeps equal totals exactly equal
+    vector = np.asarray(scoreVector)
+    scale = _integer_scale(vector, profile.n_agents)
+    if scale is None or scale == 1:
+        return profile.position_counts() @ vector
+    return (profile.position_counts() @ np.round(vector * scale).astype(np.int64)) / scale
+
+
+def _score_winner(preferences, scoreVector, tieBreak, full=False, k=None):
+    """
+        _score_winner will tally preferences with scoreVector and return the tie broken winner (and, when full is True, the
+        scores and ranking, see _rule_result). Shared by the scoring rules
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the agents' ordered alternatives
+
+            scoreVector: list - the score given to each rank position, top rank first
+
+            tieBreak: str, int or TieBreaker - the tie break type to use if neccessary
+
+            full: bool, default=False - also return the scores and the ranking
+
+            k: int, default=None - number of alternatives to rank when full is True
+
+        Return:
+            The winning alternative: int, or (winning alternative, scores dictionary, ranking list) when full is True
+    """
+
+    profile = as_profile(preferences)
+    totals = scoreTally(profile, scoreVector)
+
+    return _rule_result(profile.alternatives, totals, tieBreak, profile, full, k)
+
+
+# the rest of the functions are the voting rules
+
+def dictatorship(preferenceProfile, agent):
+    """
+        dictatorship will return the highest ranked alternative of the dictator
+
+        Parameters:
+            preferenceProfile: dictionary - the preference dictionary that has the agents as keys and their ordered alternatives 
+            as values. Output of generatePreferences function
+            
+            agent: int - the agent that will be dictator
+        
+        Return:
+            The winning alternative: int
+    """
+
+    if agent not in preferenceProfile.keys():
+        return 'No corresponding agent with that number.'
+    else:
+        return preferenceProfile[agent][0]
+
+
+def scoringRule(preferences, scoreVector, tieBreak='max', full=False, k=None):
+    """
+        scoringRule will return the alternative that has the highest score based on the 
+        scoring values for each rank in scoreVector
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the preference dictionary that has the agents as keys and their 
+            ordered alternatives as values (output of generatePreferences function), or the equivalent PreferenceProfile
+
+            scoreVector: list - list of scores to assign to each rank. The top rank for each agent
+            receives the largest score in scorevector, the second choice receives the second largest, and so on
+
+            tieBreak: str, int or TieBreaker, default='max' - the tie break type to use if neccessary. 
+            'min' calls tieBreakMin, 'max' calls tieBreakMax, int of tie breaking agent calls tieBreakAgent
+            full: bool, default=False - also return every alternative's score and the complete tie broken ranking of the 
+            alternatives, computed in the same pass
+
+            k: int, default=None - with full=True, only rank the top k alternatives (partial sort). None ranks all of them
+        
+        Return:
+            The winning alternative: int, or (winning alternative, scores dictionary, ranking list) when full is True
+    """
+
+    profile = as_profile(preferences)
+
+    if profile.n_alternatives != len(scoreVector):
+        print('Incorrect input')
+        return False
+
+    # sort the scoreVector in descending order and let the scoring engine tally it
+    return _score_winner(profile, sorted(scoreVector, reverse=True), tieBreak, full, k)
+
+def plurality(preferences, tieBreak='max', full=False, k=None):
+    """
+        plurality will return the alternative that appears the most times in the first position of the agents' prefence orderings
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the preference dictionary that has the agents as keys and their 
+            ordered alternatives as values (output of generatePreferences function), or the equivalent PreferenceProfile
+
+            tieBreak: str, int or TieBreaker, default='max' - the tie break type to use if neccessary. 
+            'min' calls tieBreakMin, 'max' calls tieBreakMax, int of tie breaking agent calls tieBreakAgent
+            full: bool, default=False - also return every alternative's score and the complete tie broken ranking of the 
+            alternatives, computed in the same pass
+
+            k: int, default=None - with full=True, only rank the top k alternatives (partial sort). None ranks all of them
+        
+        Return:
+            The winning alternative: int, or (winning alternative, scores dictionary, ranking list) when full is True
+    """
+
+    # plurality only looks at the top choices, so a dictionary is counted directly instead of being converted into a
+    # PreferenceProfile, which would cost several times more than the vote itself
+    if isinstance(preferences, dict) and preferences:
+        alternatives = np.sort(np.asarray(next(iter(preferences.values()))))
+        tops = np.fromiter((ranking[0] for ranking in preferences.values()), dtype=alternatives.dtype,
+                           count=len(preferences))
+        totals = np.bincount(np.searchsorted(alternatives, tops), minlength=len(alternatives)).astype(np.int64)
+        return _rule_result(alternatives, totals, tieBreak, preferences, full, k)
+
+    profile = as_profile(preferences)
+
+    scoreVector = _SCORE_VECTORS['plurality'](profile.n_alternatives)
+
+    return _score_winner(profile, scoreVector, tieBreak, full, k)
+    
+def veto(preferences, tieBreak='max', full=False, k=None):
+    """
+        veto assigns 0 points to the last ranked alternative in each agents' preference orderings, and 1 point to the rest. 
+        The function will then calculate the alternative with the most points and return it
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the preference dictionary that has the agents as keys and their 
+            ordered alternatives as values (output of generatePreferences function), or the equivalent PreferenceProfile
+
+            tieBreak: str, int or TieBreaker, default='max' - the tie break type to use if neccessary. 
+            'min' calls tieBreakMin, 'max' calls tieBreakMax, int of tie breaking agent calls tieBreakAgent
+            full: bool, default=False - also return every alternative's score and the complete tie broken ranking of the 
+            alternatives, computed in the same pass
+
+            k: int, default=None - with full=True, only rank the top k alternatives (partial sort). None ranks all of them
+        
+        Return:
+            The winning alternative: int, or (winning alternative, scores dictionary, ranking list) when full is True
+    """
+
+    profile = as_profile(preferences)
+
+    scoreVector = _SCORE_VECTORS['veto'](profile.n_alternatives)
+
+    return _score_winner(profile, scoreVector, tieBreak, full, k)
+
+
+def borda(preferences, tieBreak='max', full=False, k=None):
+    """
+        borda assigns a score of 0 to the least preferred alternative, a score of 1 to the second least-preferred alternative,
+        and a score of the length of an agent's preference list minus 1 to the top alternative. 
+        The function will then calculate the alternative with the highest score and return it
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the preference dictionary that has the agents as keys and their 
+            ordered alternatives as values (output of generatePreferences function), or the equivalent PreferenceProfile
+
+            tieBreak: str, int or TieBreaker, default='max' - the tie break type to use if neccessary. 
+            'min' calls tieBreakMin, 'max' calls tieBreakMax, int of tie breaking agent calls tieBreakAgent
+            full: bool, default=False - also return every alternative's score and the complete tie broken ranking of the 
+            alternatives, computed in the same pass
+
+            k: int, default=None - with full=True, only rank the top k alternatives (partial sort). None ranks all of them
+        
+        Return:
+            The winning alternative: int, or (winning alternative, scores dictionary, ranking list) when full is True
+    """
+
+    profile = as_profile(preferences)
+
+    scoreVector = _SCORE_VECTORS['borda'](profile.n_alternatives)
+
+    return _score_winner(profile, scoreVector, tieBreak, full, k)
+    
+def harmonic(preferences, tieBreak='max', full=False, k=None):
+    """
+        borda assigns a score of 1/m (m = length of an agent's preference ranking) to the least preferred alternative, 
+        a score of 1/(m-1) to the second least-preferred alternative, and a score of 1 to the top ranked alternative. 
+        The function will then calculate the alternative with the highest score and return it
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the preference dictionary that has the agents as keys and their 
+            ordered alternatives as values (output of generatePreferences function), or the equivalent PreferenceProfile
+
+            tieBreak: str, int or TieBreaker, default='max' - the tie break type to use if neccessary. 
+            'min' calls tieBreakMin, 'max' calls tieBreakMax, int of tie breaking agent calls tieBreakAgent
+            full: bool, default=False - also return every alternative's score and the complete tie broken ranking of the 
+            alternatives, computed in the same pass
+
+            k: int, default=None - with full=True, only rank the top k alternatives (partial sort). None ranks all of them
+        
+        Return:
+            The winning alternative: int, or (winning alternative, scores dictionary, ranking list) when full is True
+    """
+
+    profile = as_profile(preferences)
+
+    scoreVector = _SCORE_VECTORS['harmonic'](profile.n_alternatives)
+
+    return _score_winner(profile, scoreVector, tieBreak, full, k)
+
+@_timed('STV rounds')
+def _stv_rounds(profile, trace=False):
+    """
+        _stv_rounds is the STV engine. It keeps a pointer into every ballot (the position of the agent's highest ranked 
+        alternative that has not been removed) and a running count of how many ballots each alternative tops. When 
+        alternatives are removed only the ballots that were pointing at them are moved along, so each ballot is advanced 
+        at most once per alternative over the whole election
+
+        Parameters:
+            profile: PreferenceProfile - the agents' ordered alternatives
+
+            trace: bool, default=False - record the tallies and removed alternatives of every round
+
+        Return:
+            final_list: list - the alternative(s) removed in the last round
+
+            rounds: list - one dictionary per round with the 'round' number, the top-choice 'tallies' of the remaining 
+            alternatives, the 'eliminated' alternatives and the number of agents whose ballots were 'transferred'. Empty 
+            unless trace is True
+    """
+
+    alt_len = profile.n_alternatives
+    rankings = profile.rankings
+
+    # a ballot of a compressed profile counts once for every agent that cast it
+    weights = profile.weights
+
+    # every ballot starts pointing at its top ranked alternative
+    pointers = np.zeros(profile.n_ballots, dtype=np.intp)
+    tops = rankings[:, 0].astype(np.intp)
+    tallies = _bincount(tops, weights, alt_len)
+    _count('STV ballots touched', len(tops))
+
+    # ballots grouped by the alternative they currently point at, so the ballots to transfer are found without a scan
+    order = np.argsort(tops, kind='stable')
+    buckets = [[ballots] for ballots in np.split(order, np.cumsum(np.bincount(tops, minlength=alt_len))[:-1])]
+
+    # boolean mask of the alternatives that have not been removed yet, indexed the same as profile.alternatives
+    remaining = np.ones(alt_len, dtype=bool)
+    rounds = []
+
+    while True:
+        _count('STV rounds')
+
+        # the remaining alternatives that appear in the top ranked position the least amount of times are removed
+        candidates = np.flatnonzero(remaining)
+        eliminated = candidates[tallies[candidates] == tallies[candidates].min()]
+
+        # save list of remaining alternatives before removal
+        final_list = profile.alternatives[candidates].tolist()
+        remaining[eliminated] = False
+
+        # only the ballots pointing at a removed alternative need to move to their next remaining alternative
+        moving = np.concatenate([ballots for alt in eliminated for ballots in buckets[alt]])
+        for alt in eliminated:
+            buckets[alt] = []
+
+        if trace:
+            rounds.append({'round': len(rounds) + 1,
+                           'tallies': dict(zip(final_list, tallies[candidates].tolist())),
+                           'eliminated': profile.alternatives[eliminated].tolist(),
+                           'transferred': (len(moving) if weights is None else int(weights[moving].sum()))
+                           if remaining.any() else 0})
+
+        # check if every alternative was removed, and if so final_list is the list of the winning alternative(s)
+        if not remaining.any():
+            break
+
+        tallies[eliminated] = 0
+        _count('STV ballots touched', len(moving))
+        pending = moving
+        while len(pending):
+            pointers[pending] += 1
+            nxt = rankings[pending, pointers[pending]].astype(np.intp)
+            landed = remaining[nxt]
+            tops[pending[landed]] = nxt[landed]
+            pending = pending[~landed]
+
+        # add the transferred ballots to the tallies and buckets of their new top alternatives
+        new_tops = tops[moving]
+        tallies += _bincount(new_tops, None if weights is None else weights[moving], alt_len)
+        order = np.argsort(new_tops, kind='stable')
+        bounds = np.searchsorted(new_tops[order], np.arange(alt_len + 1))
+        for alt in np.flatnonzero(bounds[1:] > bounds[:-1]):
+            buckets[alt].append(moving[order[bounds[alt]:bounds[alt + 1]]])
+
+    return final_list, rounds
+
+
+def STV(preferences, tieBreak='max', trace=False, full=False, k=None):
+    """
+        STV works in rounds. In each round, the alternatives that appear least frequently in the first position of agents' rankings
+        are removed, and the process is repeated. When the final set of alternatives is removed, then the last set is the set 
+        of possible winners. The function will then return the winning alternative
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the preference dictionary that has the agents as keys and their 
+            ordered alternatives as values (output of generatePreferences function), or the equivalent PreferenceProfile
+
+            tieBreak: str, int or TieBreaker, default='max' - the tie break type to use if neccessary. 
+            'min' calls tieBreakMin, 'max' calls tieBreakMax, int of tie breaking agent calls tieBreakAgent
+
+            trace: bool, default=False - also return the per-round elimination trace, see _stv_rounds
+
+            full: bool, default=False - also return every alternative's score (the round in which it was removed) and the 
+            complete tie broken ranking of the alternatives, where alternatives removed later rank higher
+
+            k: int, default=None - with full=True, only rank the top k alternatives (partial sort). None ranks all of them
+        
+        Return:
+            The winning alternative: int, or (winning alternative, list of rounds) when trace is True, or 
+            (winning alternative, scores dictionary, ranking list) when full is True, or 
+            (winning alternative, scores dictionary, ranking list, list of rounds) when both are True
+    """
+
+    profile = as_profile(preferences)
+
+    # run the rounds with the incremental engine, final_list will be the list of the last removed alternative(s)
+    final_list, rounds = _stv_rounds(profile, trace or full)
+
+    if not full:
+        # once the rounds are finished, call and return tie_breaker
+        winner = tie_breaker(final_list, tieBreak, profile)
+        return (winner, rounds) if trace else winner
+
+    # an alternative's score is the round it was removed in, so the last removed alternatives are the possible winners
+    totals = np.zeros(profile.n_alternatives, dtype=np.int64)
+    for stv_round in rounds:
+        totals[np.searchsorted(profile.alternatives, stv_round['eliminated'])] = stv_round['round']
+
+    result = _rule_result(profile.alternatives, totals, tieBreak, profile, full, k)
+    if result is False:
+        return False
+    return result + (rounds,) if trace else result
+
+# the following functions are the pairwise majority rules. They all work from the pairwise majority matrix of the
+# profile (see PreferenceProfile.pairwise_matrix), which is only built once per profile
+
+def pairwiseMatrix(preferences):
+    """
+        pairwiseMatrix will return the pairwise majority matrix of the preferences
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the agents' ordered alternatives
+
+        Return:
+            pairwise: dictionary - the alternatives as keys and dictionaries as values, where pairwise[a][b] is the number 
+            of agents that rank alternative a above alternative b
+    """
+
+    profile = as_profile(preferences)
+    alternatives = profile.alternatives.tolist()
+    return {a: dict(zip(alternatives, row)) for a, row in zip(alternatives, profile.pairwise_matrix().tolist())}
+
+
+def condorcet(preferences):
+    """
+        condorcet will return the Condorcet winner, the alternative that a majority of the agents prefers to every other 
+        alternative, if there is one
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the preference dictionary that has the agents as keys and their 
+            ordered alternatives as values (output of generatePreferences function), or the equivalent PreferenceProfile
+        
+        Return:
+            The winning alternative: int, or False if there is no Condorcet winner
+    """
+
+    profile = as_profile(preferences)
+    pairwise = profile.pairwise_matrix()
+
+    # an alternative wins every duel against the others, it can never duel itself
+    wins = pairwise > pairwise.T
+    np.fill_diagonal(wins, True)
+
+    winners = np.flatnonzero(wins.all(axis=1))
+    if len(winners) == 0:
+        print('No Condorcet winner.')
+        return False
+    return int(profile.alternatives[winners[0]])
+
+
+def copeland(preferences, tieBreak='max', full=False, k=None):
+    """
+        copeland gives every alternative 1 point for each alternative it beats in a pairwise majority duel and 1/2 point 
+        for each duel that is tied. The function will then calculate the alternative with the most points and return it
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the preference dictionary that has the agents as keys and their 
+            ordered alternatives as values (output of generatePreferences function), or the equivalent PreferenceProfile
+
+            tieBreak: str, int or TieBreaker, default='max' - the tie break type to use if neccessary. 
+            'min' calls tieBreakMin, 'max' calls tieBreakMax, int of tie breaking agent calls tieBreakAgent
+
+            full: bool, default=False - also return every alternative's score and the complete tie broken ranking of the 
+            alternatives, computed in the same pass
+
+            k: int, default=None - with full=True, only rank the top k alternatives (partial sort). None ranks all of them
+        
+        Return:
+            The winning alternative: int, or (winning alternative, scores dictionary, ranking list) when full is True
+    """
+
+    profile = as_profile(preferences)
+    pairwise = profile.pairwise_matrix()
+
+    # ties on the diagonal (an alternative against itself) are not duels, so their half point is taken back
+    totals = (pairwise > pairwise.T).sum(axis=1) + 0.5 * ((pairwise == pairwise.T).sum(axis=1) - 1)
+
+    return _rule_result(profile.alternatives, totals, tieBreak, profile, full, k)
+
+
+def schulze(preferences, tieBreak='max', full=False, k=None):
+    """
+        schulze compares the alternatives by the strength of their strongest path of pairwise majority wins (the strength
+        of a path is its weakest win). Alternative a beats b when its strongest path to b is stronger than b's strongest
+        path to a. The possible winners are the alternatives that no other alternative beats
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the preference dictionary that has the agents as keys and their 
+            ordered alternatives as values (output of generatePreferences function), or the equivalent PreferenceProfile
+
+            tieBreak: str, int or TieBreaker, default='max' - the tie break type to use if neccessary. 
+            'min' calls tieBreakMin, 'max' calls tieBreakMax, int of tie breaking agent calls tieBreakAgent
+
+            full: bool, default=False - also return every alternative's score (the number of alternatives that do not beat 
+            it) and the complete tie broken ranking of the alternatives
+
+            k: int, default=None - with full=True, only rank the top k alternatives (partial sort). None ranks all of them
+        
+        Return:
+            The winning alternative: int, or (winning alternative, scores dictionary, ranking list) when full is True
+    """
+
+    profile = as_profile(preferences)
+    pairwise = profile.pairwise_matrix()
+
+    # direct paths only exist along pairwise majority wins
+    strength = np.where(pairwise > pairwise.T, pairwise, 0)
+
+    # Floyd-Warshall for the widest paths, each step relaxes every pair of alternatives through alternative i at once
+    for i in range(profile.n_alternatives):
+        strength = np.maximum(strength, np.minimum(strength[:, i, np.newaxis], strength[np.newaxis, i, :]))
+
+    beaten_by = (strength.T > strength).sum(axis=1)
+    totals = profile.n_alternatives - 1 - beaten_by
+
+    return _rule_result(profile.alternatives, totals, tieBreak, profile, full, k)
+
+
+def kemeny(preferences, tieBreak='max', full=False, k=None):
+    """
+        kemeny will approximate the Kemeny ranking, the ranking that agrees with the most pairwise preferences of the agents, 
+        and return its top alternative. Finding the exact Kemeny ranking is NP-hard, so the function starts from the tie 
+        broken borda ranking and swaps neighbouring alternatives whenever a majority prefers the lower one, until no swap
+        improves the ranking. The result agrees with the majority on every pair of neighbouring alternatives
+
+        Parameters:
+            preferences: dictionary or PreferenceProfile - the preference dictionary that has the agents as keys and their 
+            ordered alternatives as values (output of generatePreferences function), or the equivalent PreferenceProfile
+
+            tieBreak: str, int or TieBreaker, default='max' - the tie break type used to order the starting borda ranking
+
+            full: bool, default=False - also return every alternative's score (the number of alternatives ranked below it 
+            in the Kemeny ranking) and the ranking itself
+
+            k: int, default=None - with full=True, only return the top k alternatives of the ranking. None returns all of them
+        
+        Return:
+            The winning alternative: int, or (winning alternative, scores dictionary, ranking list) when full is True
+    """
+
+    profile = as_profile(preferences)
+    alt_len = profile.n_alternatives
+
+    # start from the borda ranking, as alternative indices
+    result = _score_winner(profile, _SCORE_VECTORS['borda'](alt_len), tieBreak, full=True)
+    if result is False:
+        return False
+    order = np.searchsorted(profile.alternatives, result[2]).tolist()
+
+    # swap neighbours that a majority ranks the other way round, every swap strictly increases the agreement
+    pairwise = profile.pairwise_matrix()
+    swapped = True
+    while swapped:
+        swapped = False
+        for i in range(alt_len - 1):
+            upper, lower = order[i], order[i + 1]
+            if pairwise[lower, upper] > pairwise[upper, lower]:
+                order[i], order[i + 1] = lower, upper
+                swapped = True
+
+    totals = np.empty(alt_len, dtype=np.int64)
+    totals[order] = np.arange(alt_len - 1, -1, -1)
+
+    return _rule_result(profile.alternatives, totals, tieBreak, profile, full, k)
@@ -0,0 +1,549 @@
+import numpy as np
+
+from .instrumentation import _timed
+from .ballots import iterScoreChunks, rankScores, _rank_dtype
+from .profile import PreferenceProfile, as_profile, _count_positions
+from .tiebreak import _rule_result
+from .rules import _SCORE_VECTORS, _integer_scale, STV, dictatorship, condorcet, copeland, schulze, kemeny
+
+
+def rangeVoting(values, tieBreak='max', full=False, k=None):
+    """
+        rangeVoting will take an openpyxl worksheet with each agent's preference scores and return the alternative with the largest sum
+        of preference scores
+
+        Parameters:
+            values: openpyxl worksheet, str or path - worksheet where the columns are the alternatives and the rows are the agents.
+            Each cell contains that agent's preference score for the corrsponding alternative. A ballots file name (xlsx, csv,
+            npy, parquet, ...) is streamed, see iterScoreChunks
+
+            tieBreak: str, int or TieBreaker, default='max' - the tie break type to use if neccessary. 
+            'min' calls tieBreakMin, 'max' calls tieBreakMax, int of tie breaking agent calls tieBreakAgent
+            full: bool, default=False - also return every alternative's score and the complete tie broken ranking of the 
+            alternatives, computed in the same pass
+
+            k: int, default=None - with full=True, only rank the top k alternatives (partial sort). None ranks all of them
+        
+        Return:
+            The winning alternative: int, or (winning alternative, scores dictionary, ranking list) when full is True
+    """
+
+    # sum the preference scores chunk by chunk in one pass over the worksheet. The rankings are only kept when they are 
+    # needed to break a tie with an agent
+    tally = BallotTally.from_source(values, keep_rankings=isinstance(tieBreak, int))
+
+    # call and return winning alternative
+    return tally.winner('rangeVoting', tieBreak, full=full, k=k)
+
+
+def _exact_sums(scores):
+    """
+        _exact_sums will return the column sums of a score matrix as Fractions, so running sums can be added to and taken
+        from without rounding. Scores within rounding of a decimal with up to 6 digits are read as that decimal, the way
+        scoreTally reads fractional score vectors, and summed as scaled 64-bit integers. Other scores are summed exactly
+        as the binary fractions they are
+    """
+
+    from fractions import Fraction
+
+    largest = float(np.abs(scores).max()) if scores.size else 0.0
+    for digits in range(7):
+        scale = 10 ** digits
+        if largest * scale * len(scores) >= 2 ** 62:
+            break
+        scaled = np.round(scores * scale)
+        if (np.abs(scaled / scale - scores) <= 1e-12 * np.abs(scores)).all():
+            return np.array([Fraction(int(total), scale) for total in scaled.astype(np.int64).sum(axis=0)], dtype=object)
+
+    if not np.isfinite(scores).all():
+        return scores.sum(axis=0).astype(object)
+
+    # any other score is mantissa * 2**(exponent - 53) with an integer mantissa. The mantissas are split into two 27-bit
+    # halves and summed per exponent, which is exact for up to 2**26 agents at a time
+    totals = [Fraction(0)] * scores.shape[1]
+    for start in range(0, len(scores), 1 << 26):
+        mantissas, exponents = np.frexp(scores[start:start + (1 << 26)])
+        mantissas = (mantissas * 2.0 ** 53).astype(np.int64)
+        values, groups = np.unique(exponents, return_inverse=True)
+        index = (groups.reshape(exponents.shape) * scores.shape[1] + np.arange(scores.shape[1])).ravel()
+        size = len(values) * scores.shape[1]
+        high = np.bincount(index, weights=(mantissas >> 27).ravel(), minlength=size).reshape(len(values), -1)
+        low = np.bincount(index, weights=(mantissas & ((1 << 27) - 1)).ravel(), minlength=size).reshape(len(values), -1)
+        for exponent, high_sums, low_sums in zip(values.tolist(), high.tolist(), low.tolist()):
+            unit = Fraction(2) ** (exponent - 53)
+            totals = [total + (int(high_sum) * (1 << 27) + int(low_sum)) * unit
+                      for total, high_sum, low_sum in zip(totals, high_sums, low_sums)]
+    return np.array(totals, dtype=object)
+
+
+class BallotTally:
+    """
+        BallotTally accumulates everything the scoring rules and rangeVoting need (the position count matrix and the sums of
+        the preference scores) chunk by chunk, for example from iterScoreChunks, so a ballots file of any size can be tallied 
+        in bounded memory. The ranked ballots can also be kept in compact form (one small integer per ranked alternative) 
+        for STV and for breaking ties with an agent.
+
+        Ballots can also be added and removed one at a time as they arrive with add_ballot and remove_ballot. The totals 
+        of every rule that has been asked for are kept up to date on each change, so both the update and the next winner 
+        cost O(alternatives) instead of a rescan of the earlier ballots
+
+        Attributes:
+            n_agents: int - number of agents added so far
+
+            alternatives: numpy array - the alternative numbers, 1, 2, ... in the order of the worksheet columns
+
+            position_counts: numpy array of shape (alternatives, alternatives) - see PreferenceProfile.position_counts
+
+            score_sums: numpy array - sum of the preference scores of each alternative, None if no scores were added
+    """
+
+    def __init__(self, keep_rankings=True):
+        """
+            Parameters:
+                keep_rankings: bool, default=True - keep the ranked ballots so that STV and tie breaking by agent work
+        """
+
+        self.n_agents = 0
+        self.alternatives = None
+        self.position_counts = None
+        self._score_sums = None
+        self.keep_rankings = keep_rankings
+        self._rank_chunks = []
+        self._profile = None
+
+        # number of ballots added without preference scores, rangeVoting is only available while this is 0
+        self._unscored = 0
+
+        # running totals of the rules asked for so far, keyed by rule (and score vector), as (scoreVector, totals, scale)
+        # triples. Fractional score vectors are kept scaled to integers, so adding and removing ballots never rounds
+        self._totals = {}
+
+    @classmethod
+    def from_source(cls, source, chunk_size=10000, keep_rankings=True):
+        """
+            from_source will stream a ballots file, worksheet or score matrix into a new BallotTally
+
+            Parameters:
+                source: str, path, openpyxl worksheet or numpy array - see iterScoreChunks
+
+                chunk_size: int, default=10000 - number of agents (rows) read at a time
+
+                keep_rankings: bool, default=True - keep the ranked ballots so that STV and tie breaking by agent work
+
+            Return:
+                BallotTally
+        """
+
+        tally = cls(keep_rankings)
+        for scores in iterScoreChunks(source, chunk_size):
+            tally.add_scores(scores)
+        return tally
+
+    @classmethod
+    def from_profile(cls, preferences):
+        """
+            from_profile will wrap an already ranked profile in a BallotTally, reusing its rankings and position counts. 
+            rangeVoting is not available, since the preference scores are unknown
+
+            Parameters:
+                preferences: dictionary or PreferenceProfile - the agents' ordered alternatives
+
+            Return:
+                BallotTally
+        """
+
+        profile = as_profile(preferences)
+
+        tally = cls()
+        tally.n_agents = profile.n_agents
+        tally.alternatives = profile.alternatives
+        tally.position_counts = profile.position_counts().copy()
+        tally._profile = profile
+        tally._unscored = profile.n_agents
+        return tally
+
+    @property
+    def score_sums(self):
+        # the sums are kept as exact Fractions, so removing a ballot gives back the sums from before it was added
+        return None if self._score_sums is None else self._score_sums.astype(float)
+
+    @property
+    def n_alternatives(self):
+        return 0 if self.position_counts is None else self.position_counts.shape[0]
+
+    def add_scores(self, scores):
+        """
+            add_scores will add a chunk of agents given by their preference scores
+
+            Parameters:
+                scores: array-like of shape (agents, alternatives) - each agent's preference score for each alternative
+        """
+
+        scores = np.asarray(scores, dtype=float)
+        if self._score_sums is None:
+            self._score_sums = _exact_sums(scores)
+        else:
+            self._score_sums += _exact_sums(scores)
+        self._tally_rankings(rankScores(scores), 1)
+
+    def add_rankings(self, rankings):
+        """
+            add_rankings will add a chunk of agents given by their ranked alternative indices. rangeVoting is not available
+            for agents added this way, since their preference scores are unknown
+
+            Parameters:
+                rankings: array-like of shape (agents, alternatives) - ranked alternative indices, most preferred first
+        """
+
+        rankings = np.asarray(rankings)
+        self._unscored += len(rankings)
+        self._tally_rankings(rankings, 1)
+
+    def add_ballot(self, scores=None, ranking=None):
+        """
+            add_ballot will add a single agent's ballot in O(alternatives), for tallying ballots as they arrive. Give either 
+            the agent's preference scores or their ranking
+
+            Parameters:
+                scores: list, default=None - the agent's preference score for each alternative, like a row of the worksheet
+
+                ranking: list, default=None - the agent's alternatives from most to least preferred, like a value of the 
+                dictionary returned by generatePreferences. rangeVoting is not available once a ballot is added this way
+        """
+
+        self._change_ballot(scores, ranking, 1)
+
+    def remove_ballot(self, scores=None, ranking=None):
+        """
+            remove_ballot will take back a ballot that was added with add_ballot (or add_scores/add_rankings), in 
+            O(alternatives). Give the same scores or ranking it was added with. Only available with keep_rankings=False, 
+            since the kept rankings are stored in the order the ballots arrived
+
+            Parameters:
+                scores: list, default=None - the agent's preference score for each alternative
+
+                ranking: list, default=None - the agent's alternatives from most to least preferred
+        """
+
+        if self.keep_rankings:
+            print('Ballots can only be removed from a BallotTally created with keep_rankings=False.')
+            return False
+
+        return self._change_ballot(scores, ranking, -1)
+
+    def _change_ballot(self, scores, ranking, sign):
+        """
+            _change_ballot will add (sign=1) or remove (sign=-1) a single ballot given by its scores or its ranking
+        """
+
+        if (scores is None) == (ranking is None):
+            raise ValueError('Give either scores or ranking.')
+
+        if scores is not None:
+            scores = np.asarray(scores, dtype=float)
+            rankings, alternatives = rankScores(scores[np.newaxis]), None
+        else:
+            # ranked ballots name the alternatives, which are turned into their indices in alternatives
+            alternatives = np.sort(ranking) if self.alternatives is None else self.alternatives
+            rankings = np.searchsorted(alternatives, ranking)[np.newaxis]
+
+        # the tally does not keep the ballots, but a ballot that would drive a count below zero was never added
+        if sign < 0 and not self._was_added(rankings[0], ranking):
+            print('The ballot was never added to the BallotTally.')
+            return False
+
+        if scores is not None:
+            if self._score_sums is None:
+                self._score_sums = sign * _exact_sums(scores[np.newaxis])
+            else:
+                self._score_sums += sign * _exact_sums(scores[np.newaxis])
+        else:
+            self._unscored += sign
+        self._tally_rankings(rankings, sign, alternatives)
+
+    def _was_added(self, ranking_indices, ranking=None):
+        """
+            _was_added will check that a ballot can be removed: every alternative must still be counted at the position the
+            ballot ranks it, and a ballot given by its ranking must name the tally's alternatives and match a ballot that was
+            added without scores
+        """
+
+        if self.position_counts is None or len(ranking_indices) != self.n_alternatives:
+            return False
+        if ranking is not None and (self._unscored < 1 or not np.array_equal(np.sort(ranking), self.alternatives)):
+            return False
+        return bool((self.position_counts[ranking_indices.astype(np.intp), np.arange(self.n_alternatives)] >= 1).all())
+
+    @_timed('BallotTally update')
+    def _tally_rankings(self, rankings, sign, alternatives=None):
+        """
+            _tally_rankings will add (sign=1) or remove (sign=-1) ranked ballots from the position counts and from the 
+            running totals of every rule asked for so far
+
+            Parameters:
+                rankings: numpy array of shape (agents, alternatives) - ranked alternative indices, most preferred first
+
+                sign: int - 1 to add the ballots, -1 to remove them
+
+                alternatives: numpy array, default=None - the alternative numbers, used when the tally is still empty. 
+                Defaults to 1, 2, ..., number of alternatives
+        """
+
+        alt_len = rankings.shape[1]
+        if self.position_counts is None:
+            self.alternatives = np.arange(1, alt_len + 1) if alternatives is None else np.asarray(alternatives)
+            self.position_counts = np.zeros((alt_len, alt_len), dtype=np.int64)
+
+        if len(rankings) == 1:
+            # a single ballot moves one count per position, and adds each position's score to one alternative
+            ranking = rankings[0].astype(np.intp)
+            self.position_counts[ranking, np.arange(alt_len)] += sign
+            for scoreVector, totals, _ in self._totals.values():
+                totals[ranking] += sign * scoreVector
+        else:
+            counts = _count_positions(rankings, alt_len)
+            self.position_counts += sign * counts
+            for scoreVector, totals, _ in self._totals.values():
+                totals += sign * (counts @ scoreVector)
+
+        self.n_agents += sign * len(rankings)
+
+        if self.keep_rankings:
+            # the ballots already gathered in a profile go back into the chunks, one ranking per agent
+            if self._profile is not None:
+                self._rank_chunks = [self._profile.agent_rankings()]
+                self._profile = None
+            self._rank_chunks.append(rankings.astype(_rank_dtype(alt_len)))
+
+    def profile(self):
+        """
+            profile will return the ballots added so far as a PreferenceProfile. Only available with keep_rankings=True
+
+            Return:
+                PreferenceProfile
+        """
+
+        if not self.keep_rankings:
+            raise ValueError('BallotTally was created with keep_rankings=False.')
+
+        if self._profile is None:
+            self._profile = PreferenceProfile.from_chunks(self._rank_chunks)
+
+            # the position counts were already accumulated while adding, so the profile does not need to recount them
+            self._profile._position_counts = self.position_counts.copy()
+            self._rank_chunks = []
+
+        return self._profile
+
+    def totals(self, rule, scoreVector=None):
+        """
+            totals will return every alternative's total score under a scoring rule or rangeVoting. The first call for a 
+            rule computes its totals from the position counts, later calls return the running totals kept up to date by 
+            every added or removed ballot
+
+            Parameters:
+                rule: str - 'plurality', 'veto', 'borda', 'harmonic', 'scoringRule' or 'rangeVoting'
+
+                scoreVector: list, default=None - the scores for 'scoringRule', see scoringRule
+
+            Return:
+                totals: numpy array - total score for each alternative, indexed the same as alternatives
+        """
+
+        if rule == 'rangeVoting':
+            if self._score_sums is None or self._unscored:
+                print('Preference scores were not added, rangeVoting is not available.')
+                return False
+            return self.score_sums
+
+        if rule == 'scoringRule':
+            if scoreVector is None or len(scoreVector) != self.n_alternatives:
+                print('Incorrect input')
+                return False
+            scoreVector = sorted(scoreVector, reverse=True)
+
+        elif rule in _SCORE_VECTORS:
+            scoreVector = _SCORE_VECTORS[rule](self.n_alternatives)
+
+        else:
+            print('Rule not recognized.')
+            return False
+
+        if self.n_agents <= 0:
+            print('No ballots were added.')
+            return False
+
+        key = (rule, tuple(scoreVector))
+        if key not in self._totals:
+            # scaled to integers with room for 2**31 agents, so the running totals stay exact as ballots come and go
+            scoreVector = np.asarray(scoreVector)
+            scale = _integer_scale(scoreVector, 2 ** 31)
+            if scale is None:
+                # too fine grained to scale, these totals are recomputed from the integer position counts instead
+                return self.position_counts @ scoreVector
+            scoreVector = np.round(scoreVector * scale).astype(np.int64)
+            self._totals[key] = (scoreVector, self.position_counts @ scoreVector, scale)
+
+        _, totals, scale = self._totals[key]
+        return totals.copy() if scale == 1 else totals / scale
+
+    def winner(self, rule, tieBreak='max', scoreVector=None, full=False, k=None):
+        """
+            winner will return the winning alternative of a rule over the ballots added so far
+
+            Parameters:
+                rule: str - 'plurality', 'veto', 'borda', 'harmonic', 'scoringRule', 'rangeVoting' or 'STV'
+
+                tieBreak: str, int or TieBreaker, default='max' - the tie break type to use if neccessary. 
+                'min' calls tieBreakMin, 'max' calls tieBreakMax, int of tie breaking agent calls tieBreakAgent
+
+                scoreVector: list, default=None - the scores for 'scoringRule', see scoringRule
+
+                full: bool, default=False - also return the scores and the tie broken ranking, see scoringRule
+
+                k: int, default=None - number of alternatives to rank when full is True. None ranks all of them
+
+            Return:
+                The winning alternative: int, or (winning alternative, scores dictionary, ranking list) when full is True
+        """
+
+        if (rule == 'STV' or isinstance(tieBreak, int)) and not self.keep_rankings:
+            print('Rankings were not kept, STV and tie breaking by agent are not available.')
+            return False
+
+        if rule == 'STV':
+            if self.n_agents <= 0:
+                print('No ballots were added.')
+                return False
+            return STV(self.profile(), tieBreak, full=full, k=k)
+
+        totals = self.totals(rule, scoreVector)
+        if totals is False:
+            return False
+
+        return self._break_tie(totals, tieBreak, full, k)
+
+    def _break_tie(self, totals, tieBreak, full=False, k=None):
+        """
+            _break_tie will return the tie broken alternative with the largest total, see _rule_result
+
+            Parameters:
+                totals: numpy array - total score for each alternative, indexed the same as alternatives
+
+                tieBreak: str, int or TieBreaker - the tie break type to use if neccessary
+
+                full: bool, default=False - also return the scores and the ranking
+
+                k: int, default=None - number of alternatives to rank when full is True
+
+            Return:
+                The winning alternative: int, or (winning alternative, scores dictionary, ranking list) when full is True
+        """
+
+        # only an agent tie break needs the ranked ballots
+        preferences = self.profile() if isinstance(tieBreak, int) else {}
+        return _rule_result(self.alternatives, totals, tieBreak, preferences, full, k)
+
+
+# pairwise rules that evaluate_all can run with a tie break, keyed by name
+_PAIRWISE_RULES = {
+    'copeland': copeland,
+    'schulze': schulze,
+    'kemeny': kemeny,
+}
+
+
+# rules that evaluate_all runs when none are given. rangeVoting is only added for ballots sources, which have scores
+_DEFAULT_RULES = ('plurality', 'veto', 'borda', 'harmonic', 'STV', 'dictatorship')
+
+# rules that need the ranked ballots, and so a BallotTally that kept them
+_RANKED_RULES = {'STV', 'dictatorship', 'condorcet'} | set(_PAIRWISE_RULES)
+
+
+def evaluate_all(profile, rules=None, tieBreak='max', scoreVector=None, agent=1, k=None):
+    """
+        evaluate_all will run several voting rules on the same profile in one call. The ballots are parsed once and the 
+        scoring rules share one position count matrix (and rangeVoting the preference score sums) instead of each rule 
+        flattening the preferences again
+
+        Parameters:
+            profile: dictionary, PreferenceProfile, BallotTally, str, path, openpyxl worksheet or numpy array - the 
+            preferences, or a ballots source that is streamed once with BallotTally.from_source. rangeVoting needs a 
+            ballots source (or a BallotTally built from one), since a ranked profile has no preference scores
+
+            rules: list, default=None - names of the voting functions to run. None runs the positional rules, STV and 
+            dictatorship, plus rangeVoting when profile is a ballots source or a BallotTally. 'scoringRule' uses 
+            scoreVector, and 'condorcet', 'copeland', 'schulze' and 'kemeny' share one pairwise matrix. With a 
+            BallotTally created with keep_rankings=False, the rules that need the ranked ballots (and tie breaking by 
+            agent) report a winner of False
+
+            tieBreak: str, int or TieBreaker, default='max' - the tie break type to use if neccessary. 
+            'min' calls tieBreakMin, 'max' calls tieBreakMax, int of tie breaking agent calls tieBreakAgent
+
+            scoreVector: list, default=None - the scores for 'scoringRule', see scoringRule
+
+            agent: int, default=1 - the dictator for 'dictatorship'
+
+            k: int, default=None - number of alternatives in each rule's 'ranking'. None ranks all of them
+
+        Return:
+            results: dictionary - the rule names as keys and dictionaries with the 'winner', the 'scores' of every 
+            alternative and the tie broken 'ranking' as values. STV's scores are the rounds the alternatives were removed 
+            in and it also has its per-round trace under 'rounds'. dictatorship has no scores or ranking. 
+            Example: {'borda': {'winner': 2, 'scores': {1: 10, 2: 12, 3: 8}, 'ranking': [2, 1, 3]}, ...}
+    """
+
+    # parse once: ballots sources are streamed into a tally, ranked profiles reuse their rankings and position counts
+    if isinstance(profile, BallotTally):
+        tally = profile
+    elif isinstance(profile, (dict, PreferenceProfile)):
+        tally = BallotTally.from_profile(profile)
+    else:
+        tally = BallotTally.from_source(profile)
+
+    if rules is None:
+        rules = _DEFAULT_RULES if isinstance(profile, (dict, PreferenceProfile)) else _DEFAULT_RULES + ('rangeVoting',)
+
+    results = {}
+    for rule in rules:
+        if not tally.keep_rankings and (rule in _RANKED_RULES or isinstance(tieBreak, int)):
+            # the same answer BallotTally.winner gives, instead of the error of tally.profile()
+            print(f"Rankings were not kept, {rule if rule in _RANKED_RULES else 'tie breaking by agent'} is not available.")
+            results[rule] = {'winner': False, 'scores': None}
+
+        elif rule == 'STV':
+            result = STV(tally.profile(), tieBreak, trace=True, full=True, k=k)
+            if result is False:
+                results[rule] = {'winner': False, 'scores': None}
+            else:
+                winner, scores, ranking, rounds = result
+                results[rule] = {'winner': winner, 'scores': scores, 'ranking': ranking, 'rounds': rounds}
+
+        elif rule == 'dictatorship':
+            results[rule] = {'winner': dictatorship(tally.profile(), agent), 'scores': None}
+
+        elif rule == 'condorcet':
+            results[rule] = {'winner': condorcet(tally.profile()), 'scores': None}
+
+        elif rule in _PAIRWISE_RULES:
+            # the pairwise rules share the pairwise majority matrix cached on the profile
+            result = _PAIRWISE_RULES[rule](tally.profile(), tieBreak, full=True, k=k)
+            if result is False:
+                results[rule] = {'winner': False, 'scores': None}
+            else:
+                winner, scores, ranking = result
+                results[rule] = {'winner': winner, 'scores': scores, 'ranking': ranking}
+
+        else:
+            totals = tally.totals(rule, scoreVector)
+            if totals is False:
+                results[rule] = {'winner': False, 'scores': None}
+            else:
+                result = tally._break_tie(totals, tieBreak, full=True, k=k)
+                if result is False:
+                    results[rule] = {'winner': False, 'scores': None}
+                else:
+                    winner, scores, ranking = result
+                    results[rule] = {'winner': winner, 'scores': scores, 'ranking': ranking}
+
+    return results
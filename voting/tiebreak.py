@@ -0,0 +1,337 @@
+# importing Counter from collections to help find modes of lists in a few of the functions
+from collections import Counter
+
+import numpy as np
+
+from .instrumentation import _timed
+from .profile import PreferenceProfile, as_profile
+
+
+@_timed('ranking')
+def _tie_broken_ranking(alternatives, totals, tieBreak, preferences, k=None):
+    """
+        _tie_broken_ranking will order the alternatives from the largest to the smallest total, breaking ties the same way
+        tie_breaker does. When only the top k are needed, a partial sort (np.partition) first narrows the alternatives down
+        to the ones that can reach the top k, and only those are sorted
+
+        Parameters:
+            alternatives: numpy array - the alternative numbers, indexed the same as totals
+
+            totals: numpy array - total score for each alternative
+
+            tieBreak: str, int or TieBreaker - the tie break type, already validated by tie_breaker
+
+            preferences: PreferenceProfile - the profile of the tie breaking agent, only used when tieBreak is an int
+
+            k: int, default=None - number of alternatives to rank. None ranks all of them
+
+        Return:
+            ranking: list - the alternatives, best first
+    """
+
+    alt_len = len(totals)
+    if k is None or k >= alt_len:
+        candidates = np.arange(alt_len)
+    else:
+        # every alternative at least as good as the k-th largest total can still end up in the top k after tie breaking
+        threshold = np.partition(totals, alt_len - k)[alt_len - k]
+        candidates = np.flatnonzero(totals >= threshold)
+
+    # ties are ordered by the tie breaking agent's ranking, or by the alternative number for 'max' and 'min'
+    if not isinstance(tieBreak, TieBreaker):
+        tieBreak = TieBreaker(tieBreak, preferences if isinstance(tieBreak, int) else None)
+    tie_key = tieBreak.keys(alternatives[candidates])
+
+    order = candidates[np.lexsort((tie_key, -totals[candidates]))]
+    return alternatives[order[:k]].tolist()
+
+
+def _rule_result(alternatives, totals, tieBreak, preferences, full=False, k=None):
+    """
+        _rule_result will return the tie broken winner of a rule from its totals and, when full is True, every alternative's
+        score and the tie broken ranking as well. Shared by the voting functions
+
+        Parameters:
+            alternatives: numpy array - the alternative numbers, indexed the same as totals
+
+            totals: numpy array - total score for each alternative
+
+            tieBreak: str, int or TieBreaker - the tie break type to use if neccessary
+
+            preferences: dictionary or PreferenceProfile - the agents' ordered alternatives, used for tie breaking
+
+            full: bool, default=False - also return the scores and the ranking
+
+            k: int, default=None - number of alternatives to rank when full is True. None ranks all of them
+
+        Return:
+            The winning alternative: int, or (winning alternative, scores dictionary, ranking list) when full is True
+    """
+
+    # generate list of alternative(s) that have the largest final score and call tie_breaker() to pick the winner
+    winner = tie_breaker(alternatives[totals == totals.max()].tolist(), tieBreak, preferences)
+    if not full or winner is False:
+        return winner
+
+    scores = dict(zip(alternatives.tolist(), totals.tolist()))
+    return winner, scores, _tie_broken_ranking(alternatives, totals, tieBreak, preferences, k)
+
+
+# the following set of functions are the tie breaker functions and other helper functions that are used throughout 
+# the voting functions
+
+def tieBreakMax(alternatives):
+    """
+        tieBreakMax will break a tie between a list of multiple alternatives by selecting the largest alternative integer.
+        Example: a list of the following alternatives: [2,4,1], will return 4 because 4>2>1
+
+        Parameters:
+            alternatives: list - list of the alternatives that are tied
+        
+        Return:
+            max value of alternatives: int 
+    """
+
+    return max(alternatives)
+
+def tieBreakMin(alternatives):
+    """
+        tieBreakMin will break a tie between a list of multiple alternatives by selecting the smallest alternative integer.
+        Example: a list of the following alternatives: [2,4,1], will return 1 because 4>2>1
+
+        Parameters:
+            alternatives: list - list of the alternatives that are tied
+        
+        Return:
+            min value of alternatives: int 
+    """
+
+    return min(alternatives)
+
+def tieBreakAgent(alternatives, agent, pref_dict):
+    """
+        tieBreakAgent will break a tie between a list of multiple alternatives by selecting the highest ranked alternative 
+        of the tie breaking agent that is in the list.
+        Example: a list of the following alternatives: [2,4,1], will return 1 because the tie breaking agent has the
+        following preferences: [3,1,4,2,5] and 1 is the highest ranked preference of the tied alternatives
+
+        Parameters:
+            alternatives: list - list of the alternatives that are tied
+            
+            agent: int - the tie breaking agent
+            
+            pref_dict: the preference dictionary that has the agents as keys and their ordered alternatives as values. 
+            Output of generatePreferences function, or the equivalent PreferenceProfile
+        
+        Return:
+            highest ranked preference of tie breaking agent in alternatives: int 
+    """
+
+    # a PreferenceProfile already has every agent's rank of each alternative, so no search is needed
+    if isinstance(pref_dict, PreferenceProfile):
+        positions = pref_dict.positions[pref_dict.row(agent)]
+        return min(alternatives, key=lambda x: positions[np.searchsorted(pref_dict.alternatives, x)])
+
+    # map each alternative to its index in the ranked preferences of the tie breaking agent once, then return the tied
+    # alternative with the lowest index (highest ranked)
+    ranks = {alt: idx for idx, alt in enumerate(pref_dict[agent])}
+    return min(alternatives, key=ranks.__getitem__)
+
+
+class TieBreaker:
+    """
+        TieBreaker is a reusable tie breaking rule. The tieBreak value is validated once, and for an agent tie break the 
+        agent's rank of every alternative is looked up once, so each tie is then resolved in O(number of tied alternatives).
+        A TieBreaker can be passed as the tieBreak argument of any voting function, which is useful when sweeping many
+        tie breaking agents over the same profile
+
+        Attributes:
+            tieBreak: str or int - 'max', 'min' or the tie breaking agent
+
+            alternatives: numpy array - the alternative numbers of the profile, None for 'max' and 'min'
+    """
+
+    def __init__(self, tieBreak='max', preferences=None):
+        """
+            Parameters:
+                tieBreak: str or int, default='max' - 'min' behaves like tieBreakMin, 'max' like tieBreakMax and the int
+                of a tie breaking agent like tieBreakAgent
+
+                preferences: dictionary or PreferenceProfile, default=None - the agents' ordered alternatives. Only needed
+                for an agent tie break
+        """
+
+        self.alternatives = None
+
+        if isinstance(tieBreak, int):
+            profile = as_profile(preferences) if preferences is not None else None
+            if profile is None or tieBreak not in profile:
+                raise ValueError('Tiebreaking agent number out of bounds.')
+
+            self.alternatives = profile.alternatives
+            self._positions = profile.positions[profile.row(tieBreak)].astype(np.int64)
+            self._ranks = dict(zip(self.alternatives.tolist(), self._positions.tolist()))
+
+        elif not isinstance(tieBreak, str) or tieBreak.lower() not in ('max', 'min'):
+            raise ValueError('tieBreak string not recognized.')
+
+        else:
+            tieBreak = tieBreak.lower()
+
+        self.tieBreak = tieBreak
+
+    def __call__(self, alternatives):
+        """
+            Parameters:
+                alternatives: list - list of the alternatives that are tied
+
+            Return:
+                The winning alternative: int
+        """
+
+        if self.tieBreak == 'max':
+            return tieBreakMax(alternatives)
+        elif self.tieBreak == 'min':
+            return tieBreakMin(alternatives)
+        return min(alternatives, key=self._ranks.__getitem__)
+
+    def keys(self, alternatives):
+        """
+            keys will return a sort key for each alternative, where a lower key wins the tie
+
+            Parameters:
+                alternatives: numpy array - alternative numbers
+
+            Return:
+                numpy array of keys
+        """
+
+        alternatives = np.asarray(alternatives)
+        if self.tieBreak == 'max':
+            return -alternatives
+        elif self.tieBreak == 'min':
+            return alternatives
+        return self._positions[np.searchsorted(self.alternatives, alternatives)]
+
+    def break_many(self, tied, alternatives=None):
+        """
+            break_many will break many ties at once
+
+            Parameters:
+                tied: 2-dimensional boolean array or list of lists - either a mask of shape (ties, alternatives) where row i 
+                marks the alternatives tied in tie i, or one list of tied alternatives per tie
+
+                alternatives: array-like, default=None - the alternative numbers the mask columns refer to. Defaults to the 
+                profile's alternatives for an agent tie break, otherwise to 1, 2, ..., number of columns
+
+            Return:
+                winners: numpy array - the winning alternative of each tie
+        """
+
+        if alternatives is None:
+            alternatives = self.alternatives
+
+        if not (isinstance(tied, np.ndarray) and tied.dtype == bool):
+            # turn the lists of tied alternatives into a mask over all the alternatives that appear in them
+            if alternatives is None:
+                alternatives = np.unique(np.concatenate([np.asarray(tie) for tie in tied]))
+            mask = np.zeros((len(tied), len(alternatives)), dtype=bool)
+            for i, tie in enumerate(tied):
+                mask[i, np.searchsorted(alternatives, tie)] = True
+            tied = mask
+
+        if alternatives is None:
+            alternatives = np.arange(1, tied.shape[1] + 1)
+        alternatives = np.asarray(alternatives)
+
+        # alternatives that are not part of a tie get a key that can never win
+        keys = np.where(tied, self.keys(alternatives), np.iinfo(np.int64).max)
+        return alternatives[keys.argmin(axis=1)]
+
+
+@_timed('tie_breaker')
+def tie_breaker(max_list, tieBreak, preferences):
+    """
+        tie_breaker will return the winning alternative whether a tie breaker is necessary or not. Used in all the voting functions
+
+        Parameters:
+            max_list: list - list of the alternative(s) that the voting rules determined to be winners
+            
+            tieBreak: str, int or TieBreaker - the tie break type to use if neccessary. 'min' calls tieBreakMin, 'max' calls 
+            tieBreakMax, int of tie breaking agent calls tieBreakAgent. A TieBreaker was already validated and is called directly
+            
+            preferences: dictionary - the preference dictionary that has the agents as keys and their ordered alternatives 
+            as values. Output of generatePreferences function
+        
+        Return:
+            The winning alternative: int
+    """
+
+    if isinstance(tieBreak, TieBreaker):
+        return tieBreak(max_list)
+    
+    # Error handling for incompatible tieBreak values
+    if isinstance(tieBreak, int) and tieBreak not in preferences.keys():
+        print('Tiebreaking agent number out of bounds.')
+        return False
+
+    elif isinstance(tieBreak, str) and tieBreak.lower() != 'max' and tieBreak.lower() != 'min':
+        print('tieBreak string not recognized.')
+        return False
+    
+    else:
+        # tieBreakAgent
+        if isinstance(tieBreak, int):
+            return tieBreakAgent(max_list, tieBreak, preferences)
+        
+        # tieBreakMax
+        elif tieBreak.lower() == 'max':
+            return tieBreakMax(max_list)
+        
+        # tieBreakMin, could be just an else statement, but writing it as elif statement for clarity/readability
+        elif tieBreak.lower() == 'min':
+            return tieBreakMin(max_list)
+        
+        # although this else statement is not necessary due to above error handling, including it for clarity/readability/consistency
+        else:
+            print('tieBreak error.')
+            return False
+        
+
+@_timed('flatten')
+def flatten(lst):
+    """
+        flatten will 'flatten' a list of lists into a single list
+
+        Parameters:
+            lst: list - list of lists that will be flattened into single list
+        
+        Return:
+            flattened list: list 
+    """
+
+    return [n for sub in lst for n in sub]
+
+@_timed('counting')
+def counting(pref_list):
+    """
+        counting will count the number of times each element appears in a list and return a list of the elements that
+        appear most often (the mode(s))
+
+        Parameters:
+            pref_list: list - list of elements to be counted
+        
+        Return:
+            max_list: list - list of the mode(s) of pref_list
+    """
+
+    # using Counter() and most_common() from collections library to find mode of list, will be a tuple e.g., (alternative, count)
+    counts = Counter(pref_list).most_common()
+
+    # find max of counts which will be the value of the mode
+    max_val = max(counts, key = lambda x: x[1])[1]
+
+    # add alternative to max_list if it is a mode of pref_list
+    max_list = [alt[0] for alt in counts if alt[1] == max_val]
+
+    return max_list